@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — ANALYSIS CACHE ===
+# Content-addressed on-disk cache for audio_analysis results
+# Same song re-uploaded under any name → served from disk in milliseconds
+#
+# storage/cache/analysis/
+#   <key>.json / <key>.bin   results (+ envelope sidecar), LRU by mtime
+#   hashes/<sha1(path)>.json one file's (sig, sha256): one small file per
+#                            path, so concurrent workers never lose updates
+
+import os, sys, json, time, shutil, hashlib
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+CACHE_DIR = STORAGE / "cache" / "analysis"
+HASH_DIR = CACHE_DIR / "hashes"
+
+MAX_ENTRIES = 2000
+MAX_HASHES = 4 * MAX_ENTRIES
+MAX_BYTES = 256 * 1024 * 1024
+HASH_BLOCK = 1024 * 1024
+
+def log(msg):
+    # stderr → keeps the analyzer's JSON stdout clean, still lands in service logs
+    print(f"[CACHE] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+
+def _write_json(path, obj):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _hash_entry(path):
+    return HASH_DIR / (hashlib.sha1(path.encode()).hexdigest() + ".json")
+
+# ---------------------------------------
+# CONTENT HASH (with stat pre-check)
+# ---------------------------------------
+def content_hash(path):
+    """
+    sha256 of the file bytes. (size, mtime, inode) are checked against the
+    path's hash entry first, so unchanged files are never re-read.
+    """
+    path = os.path.realpath(path)
+    st = os.stat(path)
+    sig = [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    entry = _hash_entry(path)
+    try:
+        known = json.load(open(entry))
+    except Exception:
+        known = None
+    if known and known.get("path") == path and known.get("sig") == sig:
+        try:
+            os.utime(entry)  # LRU: mtime = last use
+        except OSError:
+            pass
+        return known["sha256"]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    HASH_DIR.mkdir(parents=True, exist_ok=True)
+    _write_json(entry, {"path": path, "sig": sig, "sha256": digest})
+    evict_hashes(MAX_HASHES)
+    return digest
+
+def evict_hashes(max_entries=MAX_HASHES):
+    """Drop least recently used file hashes beyond max_entries."""
+    entries = []
+    for p in HASH_DIR.glob("*.json"):
+        try:
+            entries.append((p.stat().st_mtime, p))
+        except OSError:
+            continue
+    if len(entries) <= max_entries:
+        return 0
+
+    entries.sort()
+    dropped = 0
+    for _, p in entries[:len(entries) - max_entries]:
+        try:
+            p.unlink()
+            dropped += 1
+        except OSError:
+            pass
+    return dropped
+
+def cache_key(path, version, params):
+    blob = json.dumps({"sha256": content_hash(path), "version": version,
+                       "params": params}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+# ---------------------------------------
+# GET / PUT
+# ---------------------------------------
+def get(key):
+    entry = CACHE_DIR / f"{key}.json"
+    try:
+        result = json.load(open(entry))
+    except Exception:
+        return None
+    try:
+        os.utime(entry)  # LRU: mtime = last use
+    except OSError:
+        pass
+    return result
+
+def get_sidecar(key, dest):
+    """Copy the cached binary sidecar (envelope) to dest; False if missing."""
+    src = CACHE_DIR / f"{key}.bin"
+    try:
+        shutil.copyfile(src, dest)
+    except OSError:
+        return False
+    return True
+
+def put(key, result, sidecar=None):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    if sidecar and os.path.exists(sidecar):
+        tmp = CACHE_DIR / f".{key}.bin.{os.getpid()}.tmp"
+        shutil.copyfile(sidecar, tmp)
+        os.replace(tmp, CACHE_DIR / f"{key}.bin")
+    _write_json(CACHE_DIR / f"{key}.json", result)
+    evict()
+
+def evict(max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+    """Drop least recently used entries until both bounds hold."""
+    entries = []
+    for p in CACHE_DIR.glob("*.json"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        side = p.with_suffix(".bin")
+        size = st.st_size + (side.stat().st_size if side.exists() else 0)
+        entries.append((st.st_mtime, size, p))
+
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    dropped = 0
+    while entries and (len(entries) > max_entries or total > max_bytes):
+        _, size, p = entries.pop(0)
+        for f in (p, p.with_suffix(".bin")):
+            try:
+                f.unlink()
+            except OSError:
+                pass
+        total -= size
+        dropped += 1
+
+    if dropped:
+        log(f"🗑 Evicted {dropped} cached analyses")
+    return dropped
+
+def clear():
+    for p in list(CACHE_DIR.glob("*.json")) + list(CACHE_DIR.glob("*.bin")):
+        p.unlink()
+    log("🧹 Analysis cache cleared")
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "clear"):
+        print("Usage: analysis_cache.py stats|clear")
+        sys.exit(1)
+
+    if sys.argv[1] == "clear":
+        clear()
+    else:
+        files = list(CACHE_DIR.glob("*.json"))
+        print(json.dumps({
+            "entries": len(files),
+            "bytes": sum(p.stat().st_size for p in files),
+            "indexed_files": len(list(HASH_DIR.glob("*.json")))
+        }, indent=2))
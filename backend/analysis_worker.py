@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — RESIDENT ANALYSIS WORKER ===
+# Long-lived JSON-RPC service on a Unix socket
+# analyze / scene_split_task / compose_task run in a warm process pool:
+# no python3 startup, no re-imports, structured errors back to the caller
+
+import os, sys, json, time, socket, socketserver, threading, traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+RUN = STORAGE / "run"
+SOCKET_PATH = RUN / "analysis_worker.sock"
+
+POOL_SIZE = int(os.environ.get("AMV_WORKER_POOL", "2"))
+CALL_TIMEOUT = 600
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+def log(msg):
+    print(f"[WORKER] {time.strftime('%H:%M:%S')} {msg}", flush=True)
+
+
+class WorkerError(Exception):
+    """Error object returned by the worker (code, message, remote traceback)."""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.data = data
+
+
+# ---------------------------------------
+# METHODS (run inside pool processes)
+# ---------------------------------------
+def _analyze(path, stream=True, cache=True, envelope_out=None):
+    import audio_analysis
+    if cache:
+        return audio_analysis.analyze_cached(path, stream=stream, envelope_out=envelope_out)
+    if stream:
+        return audio_analysis.analyze_stream(path, envelope_out=envelope_out)
+    return audio_analysis.analyze(path, envelope_out=envelope_out)
+
+def _scene_split_task(task_json):
+    import scene_split
+    return scene_split.scene_split_task(task_json)
+
+def _compose_task(task_json):
+    import compose
+    return compose.compose_task(task_json)
+
+def _warm_up():
+    # pay the import cost once per pool process, not once per call
+    import audio_analysis, scene_split, compose  # noqa: F401
+
+METHODS = {
+    "analyze": _analyze,
+    "scene_split_task": _scene_split_task,
+    "compose_task": _compose_task,
+}
+
+
+# ---------------------------------------
+# SERVER
+# ---------------------------------------
+class Handler(socketserver.StreamRequestHandler):
+    """One JSON-RPC request per line, one response per line."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            resp = self.server.dispatch(line)
+            self.wfile.write((json.dumps(resp) + "\n").encode())
+            self.wfile.flush()
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.pool_size = pool_size
+        self.pool_lock = threading.Lock()
+        self.pool = self._new_pool()
+        super().__init__(str(path), Handler)
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.pool_size, initializer=_warm_up)
+
+    def _replace_pool(self, broken):
+        """Swap in a fresh pool once, however many calls saw `broken` die."""
+        with self.pool_lock:
+            if self.pool is broken:
+                log("♻ Pool process died → restarting the pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self.pool = self._new_pool()
+
+    def run(self, fn, params):
+        """Run fn in the pool; a crashed pool (OOM kill, segfault) is rebuilt and the call retried once."""
+        for attempt in (1, 2):
+            pool = self.pool
+            try:
+                if isinstance(params, list):
+                    return pool.submit(fn, *params).result()
+                return pool.submit(fn, **params).result()
+            except BrokenProcessPool:
+                self._replace_pool(pool)
+                if attempt == 2:
+                    raise
+
+    def dispatch(self, line):
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            return _error(None, PARSE_ERROR, f"parse error: {e}")
+
+        rid = req.get("id") if isinstance(req, dict) else None
+        if not isinstance(req, dict) or "method" not in req:
+            return _error(rid, INVALID_REQUEST, "invalid request")
+
+        if req["method"] == "ping":
+            return {"jsonrpc": "2.0", "id": rid, "result": {"ok": True, "pid": os.getpid()}}
+        fn = METHODS.get(req["method"])
+        if fn is None:
+            return _error(rid, METHOD_NOT_FOUND, f"unknown method {req['method']}")
+
+        params = req.get("params") or {}
+        started = time.time()
+        try:
+            result = self.run(fn, params)
+        except Exception as e:
+            log(f"❌ {req['method']} failed: {e}")
+            return _error(rid, INTERNAL_ERROR, str(e), traceback.format_exc())
+
+        log(f"✅ {req['method']} in {time.time() - started:.2f}s")
+        return {"jsonrpc": "2.0", "id": rid, "result": result}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _error(rid, code, message, data=None):
+    err = {"code": code, "message": message}
+    if data:
+        err["data"] = data
+    return {"jsonrpc": "2.0", "id": rid, "error": err}
+
+
+def serve(path=SOCKET_PATH, pool_size=POOL_SIZE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        if is_running(path):
+            log(f"⚠ Worker already running on {path}")
+            return
+        path.unlink()  # stale socket from a crashed run
+
+    server = WorkerServer(path, pool_size)
+    log(f"🚀 Analysis worker on {path} (pool={pool_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+# ---------------------------------------
+# CLIENT
+# ---------------------------------------
+def call(method, params=None, path=SOCKET_PATH, timeout=CALL_TIMEOUT):
+    """
+    Call the resident worker. Raises OSError if it is not running and
+    WorkerError if the method itself failed.
+    """
+    req = {"jsonrpc": "2.0", "id": int(time.time() * 1000), "method": method,
+           "params": params or {}}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(str(path))
+        s.sendall((json.dumps(req) + "\n").encode())
+        buf = b""
+        while not buf.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                raise ConnectionError("worker closed the connection")
+            buf += chunk
+
+    resp = json.loads(buf)
+    if "error" in resp:
+        err = resp["error"]
+        raise WorkerError(err["code"], err["message"], err.get("data"))
+    return resp["result"]
+
+def is_running(path=SOCKET_PATH):
+    try:
+        return call("ping", path=path, timeout=2).get("ok", False)
+    except (OSError, ValueError, WorkerError):
+        return False
+
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "call":
+        if len(sys.argv) < 3:
+            print("Usage: analysis_worker.py call <method> [json-params]")
+            sys.exit(1)
+        params = json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}
+        print(json.dumps(call(sys.argv[2], params), indent=2))
+    else:
+        serve()
@@ -3,58 +3,87 @@
 # Creative Boss AI + Deep Mood Logic + Fast FFmpeg Engine
 
 import subprocess
-import re
 import sys
 import json
 import os
 import math
+import time
 from statistics import mean
 
+try:
+    import numpy as np
+except ImportError:  # Termux without numpy → pure-Python path
+    np = None
+
+import analysis_cache
+import envelope
+import media_probe
+
+# bump whenever the numbers analyze() produces change → old cache entries die
+ANALYZER_VERSION = 7
+
+SAMPLE_RATE = 11025
+
+# tempo engine: 256-sample frames (~43 fps), 12 s autocorrelation windows
+TEMPO_HOP = 256
+TEMPO_WINDOW = 512
+TEMPO_MIN_BPM = 60
+TEMPO_MAX_BPM = 200
+TEMPO_LAG_STEP = 0.25      # candidate periods on a quarter-frame grid
+TEMPO_OCTAVE_RATIO = 0.7   # sub-lag peak this strong → lag spans several beats
+# lag/2 = octave; 3 and 5 half-beats (off-beat hits make those sharp peaks)
+# and triples are checked ±0.5 frame around the sub-lag (see _peak_mass)
+TEMPO_SUBLAGS = (2 / 3, 2 / 5, 1 / 3)
+TEMPO_TIGHTNESS = 100      # beat tracker: cost of deviating from the period
+
+# streaming mode: read the pipe in 4 s chunks (whole frames only)
+STREAM_CHUNK_SAMPLES = TEMPO_HOP * 172
+
 # -----------------------------
 # 🔥 FAST LOG
 # -----------------------------
 def log(x):
     print(f"[AUDIO] {x}", flush=True)
 
-# -----------------------------
-# 🎧 BASIC FFPROBE INFO
-# -----------------------------
-def ffmpeg_stats(path):
-    try:
-        cmd = f'ffprobe -v quiet -show_entries format=duration -of default=nokey=1:noprint_wrappers=1 "{path}"'
-        d = float(subprocess.run(cmd, shell=True, capture_output=True, text=True).stdout.strip())
-    except:
-        d = 0.0
-
-    # volume detection
-    cmd2 = f'ffmpeg -i "{path}" -af "volumedetect" -f null - 2>&1'
-    res = subprocess.run(cmd2, shell=True, capture_output=True, text=True)
-    vol = re.search(r"mean_volume:\s*(-?\d+\.?\d*)", res.stdout)
-    vol = float(vol.group(1)) if vol else -20.0
-
-    return d, vol
-
 # -----------------------------
 # 🎼 WAVEFORM + ENERGY
 # -----------------------------
-def extract_wave(path):
-    cmd = f'ffmpeg -i "{path}" -ac 1 -ar 11025 -f s16le - 2>/dev/null'
-    raw = subprocess.run(cmd, shell=True, capture_output=True).stdout
+def decode_pcm_py(raw):
     data = []
 
-    for i in range(0, len(raw), 2):
+    for i in range(0, len(raw) - 1, 2):
         smp = int.from_bytes(raw[i:i+2], "little", signed=True)
         data.append(smp / 32768.0)
 
     return data
 
+def decode_pcm(raw):
+    """s16le bytes → float32 array in [-1, 1) (list if numpy is missing)."""
+    if np is None:
+        return decode_pcm_py(raw)
+    pcm = np.frombuffer(raw, dtype="<i2", count=len(raw) // 2)
+    return pcm.astype(np.float32) / np.float32(32768.0)
+
+def extract_wave(path):
+    cmd = f'ffmpeg -i "{path}" -ac 1 -ar {SAMPLE_RATE} -f s16le - 2>/dev/null'
+    raw = subprocess.run(cmd, shell=True, capture_output=True).stdout
+    return decode_pcm(raw)
+
+def wave_energy(samples):
+    if np is not None and isinstance(samples, np.ndarray):
+        return float(np.abs(samples).mean(dtype=np.float64))
+    return mean([abs(s) for s in samples])
+
 # -----------------------------
 # 🥁 BPM ESTIMATE (Improved)
 # -----------------------------
-def estimate_bpm(samples, sr=11025):
+def estimate_bpm(samples, sr=SAMPLE_RATE):
     if len(samples) < sr:
         return 118
 
+    if np is not None and isinstance(samples, np.ndarray):
+        return estimate_bpm_np(samples, sr)
+
     energy = [abs(x) for x in samples]
     threshold = mean(energy) * 1.2
 
@@ -71,6 +100,240 @@ def estimate_bpm(samples, sr=11025):
     bpm = int(max(60, min(200, 60 / avg)))
     return bpm
 
+def estimate_bpm_np(samples, sr=SAMPLE_RATE):
+    energy = np.abs(samples)
+    threshold = energy.mean(dtype=np.float64) * 1.2
+
+    mid = energy[1:-1]
+    peaks = np.flatnonzero(
+        (mid > threshold) & (mid > energy[:-2]) & (mid > energy[2:])
+    ) + 1
+
+    if len(peaks) < 3:
+        return 120
+
+    avg = float(np.diff(peaks).mean(dtype=np.float64)) / sr
+    bpm = int(max(60, min(200, 60 / avg)))
+    return bpm
+
+# -----------------------------
+# 🥁 TEMPO ENGINE (onset envelope + FFT autocorrelation)
+# -----------------------------
+def frame_rms(samples, hop=TEMPO_HOP):
+    """RMS per hop-sized frame; a trailing partial frame is dropped."""
+    n = len(samples) // hop
+    if np is not None and isinstance(samples, np.ndarray):
+        frames = samples[:n * hop].reshape(n, hop)
+        return np.sqrt(np.square(frames, dtype=np.float64).mean(axis=1))
+    return [
+        math.sqrt(sum(x * x for x in samples[i * hop:(i + 1) * hop]) / hop)
+        for i in range(n)
+    ]
+
+def onset_envelope(rms):
+    """Half-wave rectified log-energy flux, one value per frame."""
+    if np is not None and isinstance(rms, np.ndarray):
+        loud = np.log1p(100.0 * rms)
+        flux = np.maximum(0.0, np.diff(loud, prepend=loud[:1]))
+        return flux
+    loud = [math.log1p(100.0 * r) for r in rms]
+    return [0.0] + [max(0.0, loud[i] - loud[i-1]) for i in range(1, len(loud))]
+
+def _autocorr_np(env, max_lag):
+    """Sum of windowed autocorrelations, all windows in one batched rfft."""
+    win = min(len(env), TEMPO_WINDOW)
+    if len(env) > win:
+        frames = np.lib.stride_tricks.sliding_window_view(env, win)[::win // 2]
+    else:
+        frames = env[None, :]
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    frames = frames * np.hanning(win)
+    spec = np.fft.rfft(frames, n=2 * win, axis=1)
+    ac = np.fft.irfft(spec.real ** 2 + spec.imag ** 2, axis=1)[:, :max_lag + 2]
+    return ac.sum(axis=0)
+
+def _autocorr_py(env, max_lag):
+    """_autocorr_np term for term: same half-overlapping Hann windows, direct sums."""
+    m = len(env)
+    win = min(m, TEMPO_WINDOW)
+    hann = [0.5 - 0.5 * math.cos(2 * math.pi * i / (win - 1)) for i in range(win)] if win > 1 else [1.0]
+    ac = [0.0] * min(max_lag + 2, win)
+    for start in range(0, m - win + 1, max(1, win // 2)):
+        frame = env[start:start + win]
+        avg = sum(frame) / win
+        x = [(v - avg) * w for v, w in zip(frame, hann)]
+        for lag in range(len(ac)):
+            ac[lag] += sum(x[i] * x[i + lag] for i in range(win - lag))
+    return ac
+
+def _lag_mass(ac, lag):
+    """
+    Autocorrelation mass around a fractional lag. A period of e.g. 21.5
+    frames splits its peak across ac[21] and ac[22]; both get full weight
+    (trapezoid: 1 within ±0.5 frame, fading to 0 at ±1) so the true period
+    is not outscored by its near-integer double.
+    """
+    total = 0.0
+    for k in range(int(math.floor(lag - 1)), int(math.ceil(lag + 1)) + 1):
+        if 0 < k < len(ac):
+            w = min(1.0, max(0.0, 2.0 - 2.0 * abs(k - lag)))
+            total += w * max(0.0, float(ac[k]))
+    return total
+
+def _peak_mass(ac, lag):
+    """Best _lag_mass within ±0.5 frame: a grid lag's multiples miss the peak by that much."""
+    return max(_lag_mass(ac, lag + d) for d in (-0.5, -0.25, 0.0, 0.25, 0.5))
+
+def _refine_period(ac, lag):
+    """Centroid of the positive autocorrelation within ±1 frame → sub-frame period."""
+    num = den = 0.0
+    for k in range(int(math.floor(lag - 1)), int(math.ceil(lag + 1)) + 1):
+        if 0 < k < len(ac) and abs(k - lag) <= 1.0:
+            v = max(0.0, float(ac[k]))
+            num += k * v
+            den += v
+    return num / den if den else lag
+
+def _track_beats(env, period, tightness=TEMPO_TIGHTNESS):
+    """
+    Dynamic-programming beat tracker: each beat picks the best previous
+    beat 0.5–2 periods back, penalised by (log of interval / period)².
+    Beats follow the onsets locally instead of extrapolating one global
+    phase, so long tracks do not drift. Returns frame indices.
+    """
+    m = len(env)
+    lo, hi = max(1, int(round(period / 2))), int(round(2 * period))
+    if m <= hi:
+        return []
+    mean = sum(env) / m
+    sd = math.sqrt(sum((v - mean) ** 2 for v in env) / m) or 1.0
+    local = [v / sd for v in env]
+    penalty = {d: tightness * math.log(d / period) ** 2 for d in range(lo, hi + 1)}
+
+    score, back = local[:], [-1] * m
+    for t in range(lo, m):
+        best, arg = None, -1
+        for d in range(lo, min(hi, t) + 1):
+            v = score[t - d] - penalty[d]
+            if best is None or v > best:
+                best, arg = v, t - d
+        score[t] = local[t] + best
+        back[t] = arg
+
+    tail = range(max(0, m - int(round(period))), m)
+    t = max(tail, key=score.__getitem__)
+    beats = []
+    while t >= 0:
+        beats.append(t)
+        t = back[t]
+    beats.reverse()
+    return _trim_beats(beats, local)
+
+def _track_beats_np(env, period, tightness=TEMPO_TIGHTNESS):
+    m = len(env)
+    lo, hi = max(1, int(round(period / 2))), int(round(2 * period))
+    if m <= hi:
+        return []
+    local = env / (env.std() or 1.0)
+    d = np.arange(hi, lo - 1, -1)                      # offsets, oldest first
+    penalty = tightness * np.log(d / period) ** 2
+
+    score = local.astype(np.float64).copy()
+    back = np.full(m, -1, dtype=np.int64)
+    for t in range(lo, m):
+        first = max(0, t - hi)
+        cand = score[first:t - lo + 1] - penalty[len(penalty) - (t - lo + 1 - first):]
+        j = int(np.argmax(cand))
+        score[t] = local[t] + cand[j]
+        back[t] = first + j
+
+    tail = max(0, m - int(round(period)))
+    t = tail + int(np.argmax(score[tail:]))
+    beats = []
+    while t >= 0:
+        beats.append(t)
+        t = int(back[t])
+    beats.reverse()
+    return _trim_beats(beats, local)
+
+def _trim_beats(beats, local):
+    """Drop leading / trailing beats that sit on (near) silence."""
+    if not beats:
+        return beats
+    strength = [float(local[b]) for b in beats]
+    cut = 0.5 * math.sqrt(sum(v * v for v in strength) / len(strength))
+    i, j = 0, len(beats)
+    while i < j and strength[i] < cut:
+        i += 1
+    while j > i and strength[j - 1] < cut:
+        j -= 1
+    return beats[i:j]
+
+def tempo_from_envelope(env, fps):
+    """
+    env: onset envelope (frames), fps: frames per second.
+    Returns {"bpm", "confidence", "beats"} — beats are seconds.
+    """
+    m = len(env)
+    lo = 60 * fps / TEMPO_MAX_BPM
+    hi = 60 * fps / TEMPO_MIN_BPM
+    if m < 2 * math.ceil(hi):
+        return None
+
+    use_np = np is not None and isinstance(env, np.ndarray)
+    max_lag = int(math.ceil(hi)) + 1
+    ac = _autocorr_np(env, max_lag) if use_np else _autocorr_py(env, max_lag)
+    if ac[0] <= 0:
+        return None
+
+    # candidate lags on a quarter-frame grid, scored on the interpolated peak mass
+    best, best_score = None, None
+    steps = int((hi - lo) / TEMPO_LAG_STEP) + 1
+    for i in range(steps):
+        lag = lo + i * TEMPO_LAG_STEP
+        mass = _lag_mass(ac, lag)
+        # a strong peak at lag/2 or another sub-lag (TEMPO_SUBLAGS) means
+        # this lag spans several beats (sub-lags may sit up to a frame below the range
+        # floor: 200 BPM ≈ lag 12.9)
+        floor = TEMPO_OCTAVE_RATIO * mass
+        if lag / 2 >= lo - 1 and _lag_mass(ac, lag / 2) >= floor:
+            continue
+        if any(lag * r >= lo - 1 and _peak_mass(ac, lag * r) >= floor for r in TEMPO_SUBLAGS):
+            continue
+        # then the log-gaussian prior around 120 BPM settles the rest
+        weight = math.exp(-0.5 * math.log2((60 * fps / lag) / 120.0) ** 2)
+        score = mass * weight
+        if best_score is None or score > best_score:
+            best, best_score = lag, score
+    if best is None:
+        return None
+
+    period = _refine_period(ac, best)
+    confidence = max(0.0, min(1.0, _lag_mass(ac, period) / float(ac[0])))
+
+    frames = _track_beats_np(env, period) if use_np else _track_beats(env, period)
+    # onset flux peaks in the frame holding the attack → report the frame centre
+    beats = [round((f + 0.5) / fps, 3) for f in frames]
+
+    if len(frames) >= 8:
+        # average tracked interval: exact over the whole track, no lag quantization
+        period = (frames[-1] - frames[0]) / (len(frames) - 1)
+    bpm = 60 * fps / period
+
+    return {
+        "bpm": int(round(max(TEMPO_MIN_BPM, min(TEMPO_MAX_BPM, bpm)))),
+        "confidence": round(confidence, 3),
+        "beats": beats
+    }
+
+def estimate_tempo(samples, sr=SAMPLE_RATE):
+    """Tempo + beat grid; falls back to the legacy peak scan on tiny inputs."""
+    env = onset_envelope(frame_rms(samples))
+    tempo = tempo_from_envelope(env, sr / TEMPO_HOP)
+    if tempo is None:
+        return {"bpm": estimate_bpm(samples, sr), "confidence": 0.0, "beats": []}
+    return tempo
+
 # -----------------------------
 # 🎭 ADVANCED MOOD ENGINE
 # -----------------------------
@@ -110,18 +373,62 @@ def detect_edit_style(bpm, mood):
 # -----------------------------
 # 🧠 SMART ANALYZE
 # -----------------------------
-def analyze(path):
+def precheck(path):
+    """
+    Error dict for inputs not worth decoding, else None. Uses the shared
+    probe cache, so a file without an audio stream is rejected without
+    spawning ffmpeg (an unreadable probe still falls through to decode).
+    """
     if not os.path.exists(path):
         return {"error": "File not found"}
+    info = media_probe.probe(path)
+    if info is not None and not media_probe.has_stream(path, "audio"):
+        return {"error": "No audio stream"}
+    return None
+
+def analyze(path, envelope_out=None):
+    """
+    One ffmpeg decode → duration, mean volume, peak, energy and tempo,
+    all computed in-process from the PCM. No volumedetect pass.
+    """
+    err = precheck(path)
+    if err:
+        return err
 
-    duration, volume = ffmpeg_stats(path)
+    started = time.perf_counter()
     wave = extract_wave(path)
+    timings = {"decode": time.perf_counter() - started}
     if len(wave) == 0:
         return {"error": "Decode error"}
 
-    # energy, bpm
-    energy = mean([abs(s) for s in wave])
-    bpm = estimate_bpm(wave)
+    t = time.perf_counter()
+    stats = StreamStats()
+    stats.update(wave)
+    timings["stats"] = time.perf_counter() - t
+
+    return finish(stats, timings, started, envelope_out)
+
+def finish(stats, timings, started, envelope_out=None):
+    t = time.perf_counter()
+    rms, onset = stats.envelope()
+    tempo = stats.tempo(onset)
+    timings["tempo"] = time.perf_counter() - t
+
+    if envelope_out:
+        # compact RMS/onset sidecar for compose + render (see envelope.py)
+        t = time.perf_counter()
+        envelope.write_envelope(envelope_out, rms, onset, stats.sr / stats.hop)
+        timings["envelope"] = time.perf_counter() - t
+
+    out = build_result(stats.summary(), tempo)
+    timings["total"] = time.perf_counter() - started
+    out["timings"] = {k: round(v * 1000, 1) for k, v in timings.items()}  # ms
+    return out
+
+def build_result(summary, tempo):
+    bpm = tempo["bpm"]
+    volume = summary["volume"]
+    energy = summary["energy"]
 
     # main mood
     mood = detect_mood(bpm, volume, energy)
@@ -129,22 +436,371 @@ def analyze(path):
     style = detect_edit_style(bpm, mood)
 
     return {
-        "duration": round(duration, 2),
+        "duration": round(summary["duration"], 2),
         "volume": round(volume, 2),
+        "peak": round(summary["peak"], 2),
         "bpm": bpm,
+        "bpm_confidence": tempo["confidence"],
         "energy": round(energy, 4),
         "mood": mood,
         "sub_mood": submood,
-        "edit_style": style
+        "edit_style": style,
+        "beats": tempo["beats"]
     }
 
+# -----------------------------
+# 🌊 STREAMING ANALYZE (bounded memory)
+# -----------------------------
+def _concat(parts):
+    if np is not None and any(isinstance(p, np.ndarray) for p in parts):
+        return np.concatenate(parts)
+    return [x for p in parts for x in p]
+
+class StreamStats:
+    """
+    Online energy / volume / onset statistics over PCM chunks.
+
+    Samples are reduced to per-frame RMS as they arrive (256x smaller than
+    the PCM), so the tempo engine sees exactly the envelope analyze() builds.
+    """
+
+    def __init__(self, sr=SAMPLE_RATE, hop=TEMPO_HOP):
+        self.sr = sr
+        self.hop = hop
+        self.count = 0
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.peak = 0.0
+        self.carry = []         # < hop samples left over from the last chunk
+        self.rms = []
+
+    def update(self, chunk):
+        n = len(chunk)
+        if n == 0:
+            return
+        if np is not None and isinstance(chunk, np.ndarray):
+            self.abs_sum += float(np.abs(chunk).sum(dtype=np.float64))
+            self.sq_sum += float(np.square(chunk, dtype=np.float64).sum())
+            self.peak = max(self.peak, float(np.abs(chunk).max()))
+        else:
+            self.abs_sum += sum(abs(x) for x in chunk)
+            self.sq_sum += sum(x * x for x in chunk)
+            self.peak = max(self.peak, max(abs(x) for x in chunk))
+        self.count += n
+
+        if len(self.carry):
+            chunk = _concat([self.carry, chunk])
+        whole = len(chunk) - len(chunk) % self.hop
+        self.rms.append(frame_rms(chunk[:whole], self.hop))
+        self.carry = chunk[whole:]
+
+    def summary(self):
+        """duration (s), mean volume + peak (dBFS, like volumedetect), energy."""
+        mean_sq = self.sq_sum / self.count
+        return {
+            "duration": self.count / self.sr,
+            "volume": 10 * math.log10(mean_sq) if mean_sq > 0 else -91.0,
+            "peak": 20 * math.log10(self.peak) if self.peak > 0 else -91.0,
+            "energy": self.abs_sum / self.count
+        }
+
+    def envelope(self):
+        """(per-frame RMS, onset strength) at sr / hop frames per second."""
+        rms = _concat(self.rms)
+        return rms, onset_envelope(rms)
+
+    def tempo(self, onset=None):
+        if onset is None:
+            onset = self.envelope()[1]
+        tempo = tempo_from_envelope(onset, self.sr / self.hop)
+        if tempo is None:
+            tempo = {"bpm": 118, "confidence": 0.0, "beats": []}
+        return tempo
+
+def iter_pcm_chunks(path, chunk_samples=STREAM_CHUNK_SAMPLES):
+    """Yield decoded chunks straight from the ffmpeg pipe as they arrive."""
+    cmd = ["ffmpeg", "-v", "quiet", "-i", path, "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    carry = b""
+    try:
+        while True:
+            block = proc.stdout.read(chunk_samples * 2)
+            if not block:
+                break
+            block = carry + block
+            cut = len(block) - (len(block) % 2)
+            carry = block[cut:]
+            yield decode_pcm(block[:cut])
+    finally:
+        proc.stdout.close()
+        proc.wait()
+
+def analyze_stream(path, chunk_samples=STREAM_CHUNK_SAMPLES, envelope_out=None):
+    err = precheck(path)
+    if err:
+        return err
+
+    started = time.perf_counter()
+    timings = {"decode": 0.0, "stats": 0.0}
+    stats = StreamStats()
+
+    t = time.perf_counter()
+    for chunk in iter_pcm_chunks(path, chunk_samples):
+        now = time.perf_counter()
+        timings["decode"] += now - t   # time blocked on the pipe
+        stats.update(chunk)
+        t = time.perf_counter()
+        timings["stats"] += t - now
+
+    if stats.count == 0:
+        return {"error": "Decode error"}
+    return finish(stats, timings, started, envelope_out)
+
+# -----------------------------
+# 💾 CACHED ANALYZE
+# -----------------------------
+def analyze_cached(path, stream=False, envelope_out=None):
+    """analyze()/analyze_stream() behind the content-addressed result cache."""
+    if not os.path.exists(path):
+        return {"error": "File not found"}
+
+    started = time.perf_counter()
+    params = {"sr": SAMPLE_RATE, "hop": TEMPO_HOP, "window": TEMPO_WINDOW,
+              "bpm_range": [TEMPO_MIN_BPM, TEMPO_MAX_BPM]}
+    key = analysis_cache.cache_key(path, ANALYZER_VERSION, params)
+
+    hit = analysis_cache.get(key)
+    if hit is not None and envelope_out:
+        # the envelope sidecar is cached next to the JSON entry
+        if not analysis_cache.get_sidecar(key, envelope_out):
+            hit = None
+    if hit is not None:
+        ms = round((time.perf_counter() - started) * 1000, 1)
+        analysis_cache.log(f"⚡ HIT {os.path.basename(path)} ({ms} ms)")
+        hit["timings"] = {"cache": ms, "total": ms}
+        hit["cached"] = True
+        return hit
+
+    if stream:
+        out = analyze_stream(path, envelope_out=envelope_out)
+    else:
+        out = analyze(path, envelope_out=envelope_out)
+    if "error" not in out:
+        analysis_cache.put(key, out, sidecar=envelope_out)
+        analysis_cache.log(f"💾 MISS {os.path.basename(path)} → stored")
+    return out
+
+# -----------------------------
+# 📚 BATCH LIBRARY ANALYSIS
+# -----------------------------
+AUDIO_EXTS = (".mp3", ".wav", ".flac", ".m4a", ".aac", ".ogg", ".opus", ".wma")
+
+def find_audio(target):
+    """Directory (recursive) or glob pattern → sorted list of audio files."""
+    import glob
+    if os.path.isdir(target):
+        files = [
+            os.path.join(d, f)
+            for d, _, names in os.walk(target)
+            for f in names if f.lower().endswith(AUDIO_EXTS)
+        ]
+    else:
+        files = [f for f in glob.glob(target, recursive=True) if os.path.isfile(f)]
+    return sorted(os.path.abspath(f) for f in files)
+
+def _done_paths(out_path):
+    """
+    Paths with a successful record in a (possibly partial) JSONL output.
+    Error records do not count: a resumed run retries those files.
+    """
+    done = set()
+    if not out_path or not os.path.exists(out_path):
+        return done
+    with open(out_path, errors="ignore") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+                if "error" not in rec:
+                    done.add(rec["path"])
+            except (ValueError, KeyError, TypeError):
+                continue  # truncated last line from an interrupted run
+    return done
+
+def _batch_one(path, stream):
+    try:
+        return path, analyze_cached(path, stream=stream)
+    except Exception as e:
+        return path, {"error": str(e)}
+
+def analyze_batch(target, out_path=None, workers=None, stream=True):
+    """
+    Analyze every audio file under target across a process pool and write
+    one JSONL record per file as soon as it finishes. Files already done in
+    out_path are skipped, so an interrupted run resumes where it stopped
+    (files that failed are tried again).
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    files = find_audio(target)
+    done = _done_paths(out_path)
+    todo = [f for f in files if f not in done]
+    workers = workers or os.cpu_count() or 1
+    print(f"[AUDIO] batch: {len(files)} files, {len(done)} already done, "
+          f"{len(todo)} to analyze on {workers} workers", file=sys.stderr, flush=True)
+
+    if out_path:
+        # an interrupted run can leave a half-written line behind
+        if os.path.exists(out_path) and os.path.getsize(out_path):
+            with open(out_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_nl = f.read(1) != b"\n"
+            if needs_nl:
+                with open(out_path, "a") as f:
+                    f.write("\n")
+        out = open(out_path, "a")
+    else:
+        out = sys.stdout
+
+    started = time.perf_counter()
+    finished = failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_batch_one, f, stream) for f in todo]
+            for fut in as_completed(futures):
+                path, result = fut.result()
+                out.write(json.dumps({"path": path, **result}) + "\n")
+                out.flush()
+                finished += 1
+                failed += "error" in result
+                if finished % 25 == 0:
+                    rate = finished / (time.perf_counter() - started)
+                    print(f"[AUDIO] batch: {finished}/{len(todo)} ({rate:.2f} files/s)",
+                          file=sys.stderr, flush=True)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    rate = finished / elapsed if elapsed > 0 else 0.0
+    print(f"[AUDIO] batch done: {finished} files ({failed} failed) in {elapsed:.1f}s "
+          f"→ {rate:.2f} files/s", file=sys.stderr, flush=True)
+    return {"files": finished, "failed": failed, "seconds": round(elapsed, 2),
+            "files_per_sec": round(rate, 2)}
+
+# -----------------------------
+# 🧪 PARITY CHECK (NumPy vs pure Python)
+# -----------------------------
+def parity_check(path):
+    """Decode once, run both paths, report any drift in the derived numbers."""
+    if np is None:
+        return {"error": "numpy not installed"}
+
+    cmd = f'ffmpeg -i "{path}" -ac 1 -ar {SAMPLE_RATE} -f s16le - 2>/dev/null'
+    raw = subprocess.run(cmd, shell=True, capture_output=True).stdout
+    if len(raw) < 2:
+        return {"error": "Decode error"}
+
+    py_wave = decode_pcm_py(raw)
+    np_wave = decode_pcm(raw)
+
+    py = {"energy": round(wave_energy(py_wave), 4), "bpm": estimate_bpm(py_wave),
+          "tempo": estimate_tempo(py_wave)["bpm"]}
+    vec = {"energy": round(wave_energy(np_wave), 4), "bpm": estimate_bpm(np_wave),
+           "tempo": estimate_tempo(np_wave)["bpm"]}
+
+    return {
+        "samples": len(py_wave),
+        "max_sample_diff": float(np.max(np.abs(np_wave - np.asarray(py_wave)))),
+        "python": py,
+        "numpy": vec,
+        "match": py == vec
+    }
+
+# (bpm, seconds, off-beat level): octave-prone tempi, a long track where a
+# global grid drifts, and fast tempi whose off-beat hits invite a 3:2 error
+CLICK_CASES = [(90, 180, 0.0), (120, 30, 0.0), (140, 30, 0.0), (180, 30, 0.0), (200, 30, 0.0),
+               (120, 30, 0.5), (165, 30, 0.5), (175, 30, 0.5), (185, 30, 0.5)]
+CLICK_MAX_ERROR = 0.025  # s, about one hop
+
+def click_track(bpm, seconds, sr=SAMPLE_RATE, offset=0.1, offbeat=0.0):
+    """
+    10 ms 1 kHz bursts every beat starting at `offset` seconds (plain list);
+    offbeat > 0 adds a softer hit of that relative level between beats.
+    """
+    n = int(0.01 * sr)
+    burst = [0.8 * (1 - i / n) * math.sin(2 * math.pi * 1000 * i / sr) for i in range(n)]
+    hits = [(0.0, burst)]
+    if offbeat:
+        hits.append((0.5, [offbeat * x for x in burst]))
+    wave = [0.0] * int(seconds * sr)
+    period = 60 / bpm
+    t = offset
+    while (t + 0.5 * period) * sr + n < len(wave):
+        for at, hit in hits:
+            start = int(round((t + at * period) * sr))
+            wave[start:start + n] = hit
+        t += period
+    return wave
+
+def click_check():
+    """Known-tempo click tracks through both tempo paths: bpm + beat placement."""
+    out = []
+    for bpm, seconds, offbeat in CLICK_CASES:
+        wave = click_track(bpm, seconds, offbeat=offbeat)
+        period = 60 / bpm
+        row = {"bpm": bpm, "seconds": seconds, "offbeat": offbeat}
+        for name, samples in (("python", wave), ("numpy", np.asarray(wave, dtype=np.float32))):
+            tempo = estimate_tempo(samples)
+            err = max((abs((b - 0.1) - round((b - 0.1) / period) * period)
+                       for b in tempo["beats"]), default=None)
+            row[name] = {"bpm": tempo["bpm"], "confidence": tempo["confidence"],
+                         "beats": len(tempo["beats"]),
+                         "max_beat_error": None if err is None else round(err, 3)}
+        row["ok"] = all(abs(row[k]["bpm"] - bpm) <= 1 and row[k]["max_beat_error"] is not None
+                        and row[k]["max_beat_error"] <= CLICK_MAX_ERROR
+                        for k in ("python", "numpy"))
+        out.append(row)
+    return out
+
 # -----------------------------
 # 🔌 CLI DIRECT CALL
 # -----------------------------
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: audio_analysis.py <audiofile>")
-        sys.exit(1)
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="audio_analysis.py")
+    ap.add_argument("audiofile", nargs="?")
+    ap.add_argument("--batch", metavar="DIR_OR_GLOB", help="analyze a whole library → JSONL")
+    ap.add_argument("--out", help="batch: JSONL output (appended / resumed)")
+    ap.add_argument("--workers", type=int, help="batch: process pool size (default: all cores)")
+    ap.add_argument("--parity", action="store_true", help="compare NumPy vs pure-Python paths + click-track tempo check")
+    ap.add_argument("--stream", action="store_true", help="bounded-memory streaming mode")
+    ap.add_argument("--no-cache", action="store_true", help="always re-analyze")
+    ap.add_argument("--envelope", metavar="PATH", help="also write the RMS/onset envelope sidecar")
+    args = ap.parse_args()
+
+    if args.batch:
+        analyze_batch(args.batch, args.out, args.workers, stream=True)
+        sys.exit(0)
+
+    if args.parity:
+        if np is None:
+            print(json.dumps({"error": "numpy not installed"}, indent=2))
+            sys.exit(1)
+        clicks = click_check()
+        out = parity_check(args.audiofile) if args.audiofile else {"match": True}
+        out["clicks"] = clicks
+        out["match"] = bool(out.get("match")) and all(c["ok"] for c in clicks)
+        print(json.dumps(out, indent=2))
+        sys.exit(0 if out["match"] else 1)
+
+    if not args.audiofile:
+        ap.error("audiofile is required (or use --batch / --parity)")
 
-    out = analyze(sys.argv[1])
+    if args.no_cache and args.stream:
+        out = analyze_stream(args.audiofile, envelope_out=args.envelope)
+    elif args.no_cache:
+        out = analyze(args.audiofile, envelope_out=args.envelope)
+    else:
+        out = analyze_cached(args.audiofile, stream=args.stream, envelope_out=args.envelope)
     print(json.dumps(out, indent=2))
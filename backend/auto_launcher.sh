@@ -14,11 +14,13 @@ pkill -f "cloud_sync_manager.py"
 pkill -f "media_optimizer.py"
 pkill -f "auto_publish.py"
 pkill -f "log_viewer.py"
+pkill -f "analysis_worker.py"
 
 sleep 2
 
 # Start all systems
 nohup node server.js > ~/AI-AMV-STUDIO/storage/logs/server.log 2>&1 &
+nohup python3 analysis_worker.py > ~/AI-AMV-STUDIO/storage/logs/analysis_worker.log 2>&1 &
 nohup python3 orchestrator.py > ~/AI-AMV-STUDIO/storage/logs/orchestrator.log 2>&1 &
 nohup python3 render_manager.py > ~/AI-AMV-STUDIO/storage/logs/render_manager.log 2>&1 &
 nohup python3 task_monitor.py > ~/AI-AMV-STUDIO/storage/logs/task_monitor.log 2>&1 &
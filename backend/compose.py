@@ -3,9 +3,14 @@
 # Builds final AMV timeline from audio analysis + scenes + effects
 # Works with Creative Boss AI + Gemini Manager
 
-import os, json, time, random
+import os, json, time
 from pathlib import Path
 
+import effects
+import render_cache
+from envelope import open_envelope
+from timeline import Timeline
+
 ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
 STORAGE = ROOT / "storage"
 TEMP = STORAGE / "temp"
@@ -30,56 +35,59 @@ MOOD_EFFECTS = {
     "cinematic": ["film_glow", "smooth_pan", "fade"]
 }
 
-# ---------------------------------------
-# BUILD SINGLE CLIP BLOCK
-# ---------------------------------------
-def make_block(clip, start, end, effect):
-    return {
-        "clip": clip,
-        "start": start,
-        "end": end,
-        "duration": round(end - start, 2),
-        "effect": effect
-    }
+# cuts landing on sections this much louder than the track mean get impact fx
+LOUD_SECTION = 1.3
+IMPACT_EFFECTS = MOOD_EFFECTS["aggressive"]
 
 # ---------------------------------------
 # GENERATE TIMELINE BASED ON AUDIO
 # ---------------------------------------
 def generate_timeline(task):
+    """Timeline (see timeline.py) built from scenes, mood and the beat grid."""
     mood = task.get("analysis", {}).get("mood", "cinematic")
     bpm = task.get("analysis", {}).get("bpm", 120)
     sub = task.get("analysis", {}).get("sub_mood", "flow")
+    beat_grid = task.get("analysis", {}).get("beats") or []
 
     scenes = task.get("scenes", [])
     clips = task.get("scene_clips", [])
 
+    timeline = Timeline()
     if not scenes or not clips:
         log("⚠ No scenes/clips → fallback timeline.")
-        return [make_block(None, 0, 5, "fade")]
+        timeline.append(None, 0, 5, "fade", beats=1)
+        return timeline
 
-    timeline = []
     beat_length = 60 / bpm  # seconds per beat
 
     log(f"🎵 BPM={bpm}, beat={beat_length:.2f}s, mood={mood}")
 
-    for i, sc in enumerate(scenes):
+    # loudness envelope sidecar from the analyzer (mmapped, O(1) per lookup)
+    env = open_envelope(task.get("envelope"))
+    rng = render_cache.rng_for(task, "compose")  # seed lands in task["seed"]
+
+    order = sorted(range(len(scenes)), key=lambda i: scenes[i]["start"])
+    for i in order:
+        sc = scenes[i]
         s, e = sc["start"], sc["end"]
-        dur = e - s
-        if dur <= 0:
+        if e - s <= 0:
             continue
 
         effect_pool = MOOD_EFFECTS.get(mood, TRANSITIONS)
-        effect = random.choice(effect_pool)
+        loudness = env.loudness(s) if env else None
+        if loudness is not None and loudness >= LOUD_SECTION:
+            effect_pool = IMPACT_EFFECTS
+        effect = effects.pick(effect_pool, rng)  # only what this ffmpeg can render
 
         clip = clips[i % len(clips)]
+        timeline.append(clip, s, e, effect,
+                        round(loudness, 2) if loudness is not None else None)
 
-        block = make_block(clip, s, e, effect)
-        timeline.append(block)
+    if env:
+        env.close()
 
-    # Shorten to match beat subdivisions
-    for t in timeline:
-        beats = max(1, int(t["duration"] / beat_length))
-        t["beats"] = beats
+    # Shorten to match beat subdivisions (bulk: one binary search per edge)
+    timeline.count_beats(beat_grid, beat_length)
 
     log(f"🎬 Timeline blocks: {len(timeline)}")
     return timeline
@@ -89,9 +97,9 @@ def generate_timeline(task):
 # ---------------------------------------
 def save_timeline(task_id, timeline):
     out_path = TEMP / f"{task_id}_timeline.json"
-    with open(out_path, "w") as f:
-        json.dump(timeline, f, indent=2)
-    return out_path
+    if not isinstance(timeline, Timeline):
+        timeline = Timeline.from_list(timeline)
+    return timeline.save(out_path)
 
 # ---------------------------------------
 # MAIN COMPOSE FUNCTION
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — EFFECT REGISTRY ===
+# One table for every effect / transition name the planners emit
+# (render_manager, orchestrator, compose) → a parameterized ffmpeg
+# filter chain + optional xfade transition.
+# Checked once against `ffmpeg -filters` + `ffmpeg -h filter=xfade`
+# (cached on disk per ffmpeg binary) so plans never contain effects or
+# transitions this machine cannot render.
+
+import os, sys, json, random, shutil, subprocess
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+FILTER_CACHE = STORAGE / "cache" / "ffmpeg_filters.json"
+
+# render defaults every chain can reference
+DEFAULTS = {"w": 1280, "h": 720, "fps": 30}
+
+
+class UnsupportedEffect(ValueError):
+    """Effect name not registered, or needs a filter this ffmpeg lacks."""
+
+
+def _fx(chain, xfade=None, **params):
+    return {"chain": chain, "xfade": xfade, "params": params}
+
+# ---------------------------------------
+# CHAIN TEMPLATES
+# ---------------------------------------
+FLASH = "eq=brightness='{amount}*exp(-{decay}*t)':eval=frame"
+SHAKE = ("crop=w=iw-2*{amp}:h=ih-2*{amp}:x='{amp}+{amp}*sin(t*{freq})':"
+         "y='{amp}+{amp}*cos(t*{freq}*1.3)',scale={w}:{h}")
+ZOOM_IN = ("zoompan=z='min(1+{rate}*on,{max})':x='iw/2-(iw/zoom/2)':"
+           "y='ih/2-(ih/zoom/2)':d=1:s={w}x{h}:fps={fps}")
+ZOOM_OUT = ("zoompan=z='max({max}-{rate}*on,1)':x='iw/2-(iw/zoom/2)':"
+            "y='ih/2-(ih/zoom/2)':d=1:s={w}x{h}:fps={fps}")
+GLITCH = "rgbashift=rh=-{shift}:bh={shift},noise=alls={noise}:allf=t"
+GLOW = "gblur=sigma={sigma},eq=brightness={lift}:saturation={sat}"
+FILM = "eq=contrast={contrast}:saturation={sat},vignette,noise=alls={grain}:allf=t"
+STREAK = "tmix=frames={frames}"
+PUNCH = "eq=contrast={contrast}:saturation={sat},vignette"
+
+EFFECTS = {
+    "none": _fx("null"),
+
+    # fades / flashes
+    "fade": _fx("fade=t=in:d={d}", "fade", d=0.3),
+    "slow_fade": _fx("fade=t=in:d={d}", "fadeslow", d=0.8),
+    "flash": _fx(FLASH, "fadewhite", amount=0.6, decay=6),
+    "flash_white": _fx(FLASH, "fadewhite", amount=0.8, decay=5),
+    "white_flash": _fx(FLASH, "fadewhite", amount=0.8, decay=5),
+    "lighting_flash": _fx(FLASH, "fadewhite", amount=0.5, decay=9),
+    "impact_flash": _fx(FLASH, "fadewhite", amount=0.9, decay=8),
+    "cross_flash": _fx(FLASH, "fadewhite", amount=0.5, decay=6),
+    "red_flash": _fx("colorbalance=rs={red}:rm={red}," + FLASH, "fadeblack",
+                     red=0.3, amount=0.4, decay=6),
+
+    # camera motion
+    "shake": _fx(SHAKE, amp=8, freq=40),
+    "shake_heavy": _fx(SHAKE, amp=20, freq=45),
+    "shake_cut": _fx(SHAKE, "hblur", amp=12, freq=50),
+    "impact_shake": _fx(SHAKE, amp=16, freq=55),
+    "zoom_in": _fx(ZOOM_IN, "zoomin", rate=0.004, max=1.3),
+    "zoom_out": _fx(ZOOM_OUT, "fade", rate=0.004, max=1.3),
+    "zoom_hit": _fx(ZOOM_IN, "zoomin", rate=0.02, max=1.25),
+    "zoom_crash": _fx(ZOOM_IN, "zoomin", rate=0.04, max=1.5),
+    "soft_zoom": _fx(ZOOM_IN, "fade", rate=0.0015, max=1.12),
+    "zoom_whip": _fx(ZOOM_IN, "smoothleft", rate=0.02, max=1.3),
+    "smooth_pan": _fx("crop=w=iw*{scale}:h=ih*{scale}:x='(iw-ow)*min(t/{span},1)':"
+                      "y=(ih-oh)/2,scale={w}:{h}", scale=0.9, span=4),
+
+    # pure transitions (no per-block look)
+    "whip": _fx("null", "smoothleft"),
+    "whip_left": _fx("null", "smoothleft"),
+    "whip_right": _fx("null", "smoothright"),
+    "slide_left": _fx("null", "slideleft"),
+    "slide_right": _fx("null", "slideright"),
+    "spin_fast": _fx("null", "radial"),
+    "spin_cut": _fx("null", "radial"),
+
+    # colour / glitch looks
+    "rgb_split": _fx("rgbashift=rh=-{shift}:bh={shift}", shift=6),
+    "glitch": _fx(GLITCH, "pixelize", shift=6, noise=20),
+    "glitch_hard": _fx(GLITCH, "pixelize", shift=14, noise=40),
+    "glitch_cut": _fx(GLITCH, "pixelize", shift=8, noise=25),
+    "anime_glitch": _fx(GLITCH, "pixelize", shift=10, noise=15),
+    "slice": _fx(GLITCH, "hlslice", shift=4, noise=10),
+    "color_pop": _fx("eq=saturation={sat}:contrast={contrast}", sat=1.6, contrast=1.15),
+    "impact": _fx(PUNCH, contrast=1.3, sat=1.4),
+    "impact_cut": _fx(PUNCH, "fadeblack", contrast=1.35, sat=1.3),
+
+    # glow / blur
+    "glow": _fx(GLOW, sigma=1.2, lift=0.05, sat=1.2),
+    "soft_glow": _fx(GLOW, sigma=0.8, lift=0.04, sat=1.1),
+    "warm_glow": _fx("colorbalance=rs={warm}:bs=-{warm}," + GLOW, sigma=0.8, lift=0.04,
+                     sat=1.1, warm=0.08),
+    "film_glow": _fx(FILM, contrast=1.1, sat=0.9, grain=6),
+    "cinematic_glow": _fx(FILM, contrast=1.15, sat=0.95, grain=4),
+    "soft_blur": _fx("gblur=sigma={sigma}", sigma=2),
+    "blur": _fx("gblur=sigma={sigma}", sigma=3),
+    "blur_light": _fx("gblur=sigma={sigma}", sigma=1.2),
+    "blue_soft": _fx("colorbalance=bs={blue}:bm={blue},gblur=sigma=0.8", blue=0.15),
+
+    # motion streaks (frame blending)
+    "motion_blur": _fx(STREAK, frames=3),
+    "speedline": _fx(STREAK, frames=4),
+    "speed_ramp": _fx(STREAK, frames=5),
+    "speed_pop": _fx(STREAK + ",eq=saturation={sat}", sat=1.4, frames=3),
+}
+
+# ---------------------------------------
+# FFMPEG CAPABILITY PROBE (once, cached)
+# ---------------------------------------
+_caps = None
+
+def _ffmpeg_sig():
+    exe = shutil.which("ffmpeg")
+    if not exe:
+        return None
+    st = os.stat(exe)
+    return [os.path.realpath(exe), st.st_size, st.st_mtime_ns]
+
+def _probe_filters():
+    res = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True)
+    names = set()
+    for line in res.stdout.splitlines():
+        # " TSC gblur   V->V   Gaussian Blur filter."
+        parts = line.split()
+        if len(parts) >= 3 and "->" in parts[2]:
+            names.add(parts[1])
+    return names
+
+def _probe_xfade():
+    res = subprocess.run(["ffmpeg", "-hide_banner", "-h", "filter=xfade"],
+                         capture_output=True, text=True)
+    names, inside = set(), False
+    for line in res.stdout.splitlines():
+        # "  transition  <int>  ..FV..... set cross fade transition (default fade)"
+        # "     wipeleft   1    ..FV..... wipeleft transition"
+        parts = line.split()
+        if parts[:1] == ["transition"]:
+            inside = True
+        elif inside and len(parts) >= 2 and parts[1].lstrip("-").isdigit():
+            names.add(parts[0])
+        elif inside:
+            break
+    names.discard("custom")  # needs expr=…, never emitted by the registry
+    return names
+
+def _capabilities():
+    """{"filters", "xfade"}: filter names + xfade transitions of this ffmpeg build."""
+    global _caps
+    if _caps is not None:
+        return _caps
+
+    sig = _ffmpeg_sig()
+    if sig is None:
+        _caps = {"filters": frozenset(), "xfade": frozenset()}
+        return _caps
+    try:
+        cached = json.load(open(FILTER_CACHE))
+        if cached.get("sig") == sig and "xfade" in cached:
+            _caps = {"filters": frozenset(cached["filters"]), "xfade": frozenset(cached["xfade"])}
+            return _caps
+    except Exception:
+        pass
+
+    filters = _probe_filters()
+    xfade = _probe_xfade() if "xfade" in filters else set()
+    _caps = {"filters": frozenset(filters), "xfade": frozenset(xfade)}
+
+    FILTER_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = FILTER_CACHE.with_name(f".{FILTER_CACHE.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"sig": sig, "filters": sorted(filters), "xfade": sorted(xfade)}, f)
+    os.replace(tmp, FILTER_CACHE)
+    return _caps
+
+def available_filters():
+    """Filter names this ffmpeg build provides (empty if ffmpeg is missing)."""
+    return _capabilities()["filters"]
+
+def available_transitions():
+    """xfade transition names this ffmpeg build provides (older builds lack many)."""
+    return _capabilities()["xfade"]
+
+def filters_in(chain):
+    """Filter names used by a chain (commas inside quotes/parens ignored)."""
+    names, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(chain + ","):
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif ch == "," and not quoted and depth == 0:
+            names.append(chain[start:i].split("=", 1)[0].strip())
+            start = i + 1
+    return names
+
+# ---------------------------------------
+# QUERIES
+# ---------------------------------------
+def is_supported(name):
+    fx = EFFECTS.get(name)
+    if fx is None:
+        return False
+    have = available_filters()
+    return all(f in have for f in filters_in(fx["chain"]))
+
+def supported(names):
+    """names filtered down to effects this machine can render."""
+    return [n for n in names if is_supported(n)]
+
+def pick(names, rng=random, fallback="none"):
+    """Random supported effect from names (fallback if none survive)."""
+    pool = supported(names)
+    return rng.choice(pool) if pool else fallback
+
+def validate(names):
+    """Raise UnsupportedEffect listing every name that cannot be rendered."""
+    bad = sorted({n for n in names if n is not None and not is_supported(n)})
+    if bad:
+        raise UnsupportedEffect(f"unsupported effects: {', '.join(bad)}")
+
+def chain(name, **params):
+    """Filter chain for name with defaults + params substituted."""
+    if not is_supported(name):
+        raise UnsupportedEffect(f"unsupported effect: {name}")
+    fx = EFFECTS[name]
+    values = dict(DEFAULTS, **fx["params"])
+    values.update(params)
+    return fx["chain"].format(**values)
+
+def transition(name):
+    """xfade transition for name, or None for a hard cut."""
+    fx = EFFECTS.get(name)
+    if fx is None or fx["xfade"] not in available_transitions():
+        return None
+    return fx["xfade"]
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "refresh":
+        try:
+            FILTER_CACHE.unlink()
+        except OSError:
+            pass
+    have = available_filters()
+    print(json.dumps({
+        "ffmpeg_filters": len(have),
+        "xfade_transitions": sorted(available_transitions()),
+        "effects": {n: {"supported": is_supported(n), "filters": filters_in(fx["chain"]),
+                        "xfade": fx["xfade"], "transition": transition(n)}
+                    for n, fx in EFFECTS.items()}
+    }, indent=2))
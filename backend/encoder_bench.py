@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — ENCODER AUTOTUNE ===
+# Benchmark: encode a synthetic lavfi clip across presets × CRF × threads,
+# record encode fps + output size → storage/machine_profile.json
+# Stages call preset_for(stage, crf) and get the best preset for THIS
+# machine under their speed/size trade-off (hardcoded default if no profile).
+
+import os, sys, json, time, shutil, tempfile, subprocess
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+PROFILE_PATH = STORAGE / "machine_profile.json"
+
+PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"]
+CRFS = [20, 23, 26, 28]
+CLIP_SECONDS = 5
+CLIP_SIZE = "1280x720"
+CLIP_FPS = 30
+# AMV-like content: moving pattern + per-frame grain so the encoder has to work
+CLIP_SOURCE = f"testsrc2=size={CLIP_SIZE}:rate={CLIP_FPS},noise=alls=12:allf=t"
+
+# 1.0 = fastest encode wins, 0.0 = smallest file wins.
+# Edit the "tradeoff" section of machine_profile.json (kept across re-runs)
+# or set AMV_ENCODE_TRADEOFF to override every stage.
+STAGE_TRADEOFF = {
+    "preview": 0.9,   # scene clips, rchestrator previews
+    "render": 0.6,    # final AMV renders
+    "enhance": 0.5,
+    "optimize": 0.2,  # compression pass exists to save bytes
+}
+
+def log(msg):
+    print(f"[BENCH] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+
+def _thread_counts():
+    cores = os.cpu_count() or 1
+    return sorted({1, max(1, cores // 2), cores})
+
+# ---------------------------------------
+# BENCHMARK
+# ---------------------------------------
+def _make_source(work, seconds):
+    """Render the lavfi pattern once to lossless FFV1 so timings are encode-only."""
+    src = Path(work) / "source.mkv"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", CLIP_SOURCE, "-t", str(seconds),
+                    "-c:v", "ffv1", str(src)], check=True)
+    return src
+
+def encode_once(src, preset, crf, threads, out):
+    started = time.perf_counter()
+    res = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                          "-i", str(src), "-c:v", "libx264", "-preset", preset,
+                          "-crf", str(crf), "-threads", str(threads), "-an", str(out)])
+    seconds = time.perf_counter() - started
+    if res.returncode != 0 or not os.path.exists(out):
+        return None
+    size = os.path.getsize(out)
+    os.remove(out)
+    return seconds, size
+
+def run_benchmark(presets=PRESETS, crfs=CRFS, threads=None, seconds=CLIP_SECONDS):
+    threads = threads or _thread_counts()
+    frames = seconds * CLIP_FPS
+    results = []
+    work = tempfile.mkdtemp(prefix="amv_bench_")
+    try:
+        src = _make_source(work, seconds)
+        total = len(presets) * len(crfs) * len(threads)
+        for preset in presets:
+            for crf in crfs:
+                for t in threads:
+                    r = encode_once(src, preset, crf, t, Path(work) / "out.mp4")
+                    if r is None:
+                        log(f"⚠ {preset} crf={crf} threads={t} failed")
+                        continue
+                    secs, size = r
+                    results.append({
+                        "preset": preset, "crf": crf, "threads": t,
+                        "fps": round(frames / secs, 2),
+                        "bytes": size,
+                        "kbps": round(size * 8 / seconds / 1000, 1),
+                        "seconds": round(secs, 3)
+                    })
+                    log(f"⏱ [{len(results)}/{total}] {preset:<9} crf={crf} t={t}: "
+                        f"{results[-1]['fps']} fps, {results[-1]['kbps']} kb/s")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+def write_profile(results, seconds=CLIP_SECONDS):
+    old = load_profile() or {}
+    profile = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "cores": os.cpu_count(),
+        "ffmpeg": shutil.which("ffmpeg"),
+        "clip": {"source": CLIP_SOURCE, "seconds": seconds, "fps": CLIP_FPS},
+        "tradeoff": old.get("tradeoff", STAGE_TRADEOFF),
+        "results": results,
+    }
+    PROFILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PROFILE_PATH.with_name(f".{PROFILE_PATH.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, PROFILE_PATH)
+    _cache.clear()
+    return profile
+
+# ---------------------------------------
+# PROFILE READER (used by every encode stage)
+# ---------------------------------------
+_cache = {}
+
+def load_profile():
+    """machine_profile.json (re-read only when its mtime changes) or None."""
+    try:
+        mtime = PROFILE_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+    if _cache.get("mtime") != mtime:
+        try:
+            _cache.update(mtime=mtime, profile=json.load(open(PROFILE_PATH)))
+        except (OSError, ValueError):
+            return None
+    return _cache["profile"]
+
+def tradeoff_for(stage, profile=None):
+    env = os.environ.get("AMV_ENCODE_TRADEOFF")
+    if env:
+        return min(1.0, max(0.0, float(env)))
+    table = (profile or {}).get("tradeoff") or STAGE_TRADEOFF
+    return table.get(stage, STAGE_TRADEOFF.get(stage, 0.5))
+
+def choose(stage, crf=None, tradeoff=None):
+    """
+    Best measured {"preset", "threads", "fps", "kbps"} for stage, or None
+    without a profile. Each preset is scored at the CRF nearest `crf` with
+    its fastest thread count:
+        score = t · fps/max_fps + (1 − t) · min_bytes/bytes
+    """
+    profile = load_profile()
+    results = (profile or {}).get("results") or []
+    if not results:
+        return None
+    t = tradeoff if tradeoff is not None else tradeoff_for(stage, profile)
+
+    crfs = sorted({r["crf"] for r in results})
+    at = min(crfs, key=lambda c: abs(c - crf)) if crf is not None else crfs[len(crfs) // 2]
+    best = {}
+    for r in results:
+        if r["crf"] == at and (r["preset"] not in best or r["fps"] > best[r["preset"]]["fps"]):
+            best[r["preset"]] = r
+    if not best:
+        return None
+
+    max_fps = max(r["fps"] for r in best.values())
+    min_bytes = min(r["bytes"] for r in best.values())
+    def score(r):
+        return t * r["fps"] / max_fps + (1 - t) * min_bytes / r["bytes"]
+    r = max(best.values(), key=score)
+    return {"preset": r["preset"], "threads": r["threads"], "fps": r["fps"], "kbps": r["kbps"]}
+
+def preset_for(stage, crf=None, default="veryfast"):
+    """x264 preset for stage on this machine (default when never benchmarked)."""
+    pick = choose(stage, crf)
+    return pick["preset"] if pick else default
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Benchmark x264 presets and write the machine profile")
+    ap.add_argument("--presets", default=",".join(PRESETS))
+    ap.add_argument("--crfs", default=",".join(map(str, CRFS)))
+    ap.add_argument("--threads", help="comma list (default 1, cores/2, cores)")
+    ap.add_argument("--seconds", type=int, default=CLIP_SECONDS)
+    ap.add_argument("--show", action="store_true", help="print per-stage picks from the current profile")
+    args = ap.parse_args()
+
+    if not args.show:
+        results = run_benchmark(
+            args.presets.split(","),
+            [int(c) for c in args.crfs.split(",")],
+            [int(t) for t in args.threads.split(",")] if args.threads else None,
+            args.seconds,
+        )
+        if not results:
+            log("❌ No successful encodes — is ffmpeg with libx264 installed?")
+            sys.exit(1)
+        write_profile(results, args.seconds)
+        log(f"💾 Profile → {PROFILE_PATH}")
+
+    print(json.dumps({stage: choose(stage) for stage in STAGE_TRADEOFF}, indent=2))
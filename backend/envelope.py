@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — ENERGY ENVELOPE SIDECAR ===
+# Fixed-resolution loudness / onset envelope written next to the task
+# compose + render stages mmap it and read any time point in O(1)
+#
+# File layout (little endian):
+#   header  : magic "AMVENV01" | fps f32 | frames u32 | rms_mean f32 | rms_peak f32
+#   payload : frames x [rms f32, onset f32]
+
+import os, sys, json, mmap, struct
+from array import array
+
+MAGIC = b"AMVENV01"
+HEADER = struct.Struct("<8sfIff")
+ENVELOPE_FPS = 20  # 50 ms per frame → ~1.1 MB for an hour
+
+# ---------------------------------------
+# WRITE
+# ---------------------------------------
+def resample(rms, onset, src_fps, fps=ENVELOPE_FPS):
+    """Mean RMS / max onset over each output frame's span of source frames."""
+    n_src = len(rms)
+    n_out = int(n_src * fps / src_fps)
+    if n_out == 0:
+        return [], []
+    bounds = [int(i * src_fps / fps) for i in range(n_out + 1)]
+
+    out_rms, out_onset = [], []
+    for i in range(n_out):
+        a, b = bounds[i], max(bounds[i + 1], bounds[i] + 1)
+        span_rms = rms[a:b]
+        out_rms.append(float(sum(span_rms)) / len(span_rms))
+        out_onset.append(float(max(onset[a:b])))
+    return out_rms, out_onset
+
+def write_envelope(path, rms, onset, src_fps, fps=ENVELOPE_FPS):
+    rms, onset = resample(rms, onset, src_fps, fps)
+    payload = array("f")
+    for r, o in zip(rms, onset):
+        payload.append(r)
+        payload.append(o)
+    if sys.byteorder != "little":
+        payload.byteswap()
+
+    mean_rms = sum(rms) / len(rms) if rms else 0.0
+    peak_rms = max(rms) if rms else 0.0
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, fps, len(rms), mean_rms, peak_rms))
+        payload.tofile(f)
+    os.replace(tmp, path)
+    return path
+
+# ---------------------------------------
+# READ (memory-mapped)
+# ---------------------------------------
+class Envelope:
+    """
+    Memory-mapped envelope. at(t) / rms_at(t) / onset_at(t) are O(1):
+    one index computation and two float reads from the page cache.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._f = open(self.path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.fps, self.frames, self.rms_mean, self.rms_peak = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"not an envelope file: {path}")
+        self._data = memoryview(self._mm)[HEADER.size:HEADER.size + self.frames * 8].cast("f")
+
+    @property
+    def duration(self):
+        return self.frames / self.fps
+
+    def _index(self, t):
+        i = int(t * self.fps)
+        return min(max(i, 0), self.frames - 1)
+
+    def at(self, t):
+        """(rms, onset) at time t seconds (clamped to the track)."""
+        if self.frames == 0:
+            return 0.0, 0.0
+        i = self._index(t) * 2
+        return self._data[i], self._data[i + 1]
+
+    def rms_at(self, t):
+        return self.at(t)[0]
+
+    def onset_at(self, t):
+        return self.at(t)[1]
+
+    def loudness(self, t):
+        """RMS at t relative to the track mean (1.0 = average loudness)."""
+        if self.rms_mean <= 0:
+            return 0.0
+        return self.rms_at(t) / self.rms_mean
+
+    def close(self):
+        if getattr(self, "_data", None) is not None:
+            self._data.release()
+            self._data = None
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_envelope(path):
+    """Envelope or None if the sidecar is missing / unreadable."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return Envelope(path)
+    except (ValueError, OSError, struct.error):
+        return None
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: envelope.py <file.f32> [time_sec ...]")
+        sys.exit(1)
+
+    with Envelope(sys.argv[1]) as env:
+        info = {
+            "fps": env.fps, "frames": env.frames, "duration": round(env.duration, 2),
+            "rms_mean": round(env.rms_mean, 5), "rms_peak": round(env.rms_peak, 5)
+        }
+        for t in sys.argv[2:]:
+            r, o = env.at(float(t))
+            info[t] = {"rms": round(r, 5), "onset": round(o, 5)}
+        print(json.dumps(info, indent=2))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — FFMPEG RUNNER ===
+# Every long ffmpeg job goes through run():
+#   -progress pipe:1 → frame / fps / speed / out_time parsed live
+#   storage/progress/<job>.json → small status record (task_monitor serves it)
+#   no progress for STALL_TIMEOUT seconds → job is killed and marked "stalled"
+
+import os, re, sys, json, time, signal, threading, subprocess
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+PROGRESS = STORAGE / "progress"
+
+STALL_TIMEOUT = float(os.environ.get("AMV_FFMPEG_STALL", "90"))
+WRITE_EVERY = 1.0        # rewrite a status record at most once per second
+KEEP_RECORDS = 24 * 3600  # finished records older than this are pruned
+
+# exit code for jobs killed by the hang detector: below every -signum
+# Popen reports, so an outside `kill -9` (-9) is never taken for a stall
+STALLED = -1000
+
+def log(msg):
+    print(f"[FFMPEG] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+
+def _write_json(path, obj):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _safe_job(job):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(job))
+
+# ---------------------------------------
+# COMMAND REWRITE
+# ---------------------------------------
+def with_progress(cmd):
+    """Insert `-progress pipe:1 -nostats` after the ffmpeg binary."""
+    extra = ["-progress", "pipe:1", "-nostats"]
+    if isinstance(cmd, str):
+        return re.sub(r"\bffmpeg\b", "ffmpeg " + " ".join(extra), cmd, count=1)
+    return [cmd[0]] + extra + list(cmd[1:])
+
+# ---------------------------------------
+# STATUS RECORD
+# ---------------------------------------
+class Status:
+    """Live state of one ffmpeg job, flushed to PROGRESS/<job>.json."""
+
+    def __init__(self, job, total=None, meta=None):
+        self.path = PROGRESS / f"{_safe_job(job)}.json"
+        self.rec = {
+            "job": str(job), "state": "starting", "pid": None,
+            "frame": 0, "fps": 0.0, "speed": None, "out_time": 0.0,
+            "total": total, "percent": None,
+            "started": time.time(), "updated": time.time(), "last_progress": time.time()
+        }
+        if meta:
+            self.rec.update(meta)
+        self._written = 0.0
+        self.lock = threading.Lock()
+        PROGRESS.mkdir(parents=True, exist_ok=True)
+        self.flush(force=True)
+
+    def update(self, block):
+        """Apply one -progress block (dict of key → value strings)."""
+        with self.lock:
+            r = self.rec
+            before = (r["frame"], r["out_time"])
+            try:
+                r["frame"] = int(block.get("frame", r["frame"]))
+                r["fps"] = float(block.get("fps", r["fps"]))
+            except ValueError:
+                pass
+            us = block.get("out_time_us") or block.get("out_time_ms")  # both are µs
+            if us and us != "N/A":
+                try:
+                    r["out_time"] = round(int(us) / 1e6, 3)
+                except ValueError:
+                    pass
+            speed = block.get("speed", "").rstrip("x").strip()
+            r["speed"] = float(speed) if speed and speed != "N/A" else r["speed"]
+            if r["total"]:
+                r["percent"] = round(min(100.0, 100 * r["out_time"] / r["total"]), 1)
+            now = time.time()
+            r["updated"] = now
+            if (r["frame"], r["out_time"]) != before:
+                r["last_progress"] = now
+            if r["state"] == "starting":
+                r["state"] = "running"
+        self.flush()
+
+    def stalled_for(self):
+        with self.lock:
+            return time.time() - self.rec["last_progress"]
+
+    def set(self, **fields):
+        with self.lock:
+            self.rec.update(fields)
+            self.rec["updated"] = time.time()
+        self.flush(force=True)
+
+    def flush(self, force=False):
+        # reader thread + wait loop both flush: throttle check and the
+        # write share the lock, so they never race on the same tmp file
+        with self.lock:
+            now = time.time()
+            if not force and now - self._written < WRITE_EVERY:
+                return
+            try:
+                _write_json(self.path, self.rec)
+            except OSError as e:
+                # status is best effort: never kill the reader or the wait loop
+                log(f"⚠ status write failed for {self.rec['job']}: {e}")
+                return
+            self._written = now
+
+# ---------------------------------------
+# RUN
+# ---------------------------------------
+def _read_progress(stream, status):
+    block = {}
+    for line in stream:
+        key, _, value = line.strip().partition("=")
+        if not key:
+            continue
+        block[key] = value
+        if key == "progress":  # "continue" | "end" closes a block
+            status.update(block)
+            block = {}
+
+def run(cmd, job, total=None, stall=STALL_TIMEOUT, shell=False, stderr=None, meta=None):
+    """
+    Run an ffmpeg command (list, or shell string with shell=True) with live
+    progress. total = expected output duration (s) for percent. Returns the
+    exit code; STALLED if the hang detector killed it.
+    """
+    prune()
+    status = Status(job, total, meta)
+    proc = subprocess.Popen(with_progress(cmd), shell=shell, stdout=subprocess.PIPE,
+                            stderr=stderr, text=True, bufsize=1,
+                            start_new_session=shell)  # shell → kill the whole group
+    status.set(pid=proc.pid)
+    reader = threading.Thread(target=_read_progress, args=(proc.stdout, status), daemon=True)
+    reader.start()
+
+    code, stalled = None, False
+    while code is None:
+        try:
+            code = proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            if stall and status.stalled_for() > stall:
+                log(f"⛔ {job}: no progress for {stall:.0f}s → killing pid {proc.pid}")
+                _kill(proc, shell)
+                proc.wait()
+                code, stalled = STALLED, True
+            else:
+                status.flush()
+
+    reader.join(timeout=2)
+    if stalled:
+        state = "stalled"
+    else:
+        state = "done" if code == 0 else "failed"
+    status.set(state=state, returncode=code, finished=time.time(),
+               percent=100.0 if code == 0 and total else status.rec["percent"])
+    return code
+
+def _kill(proc, group):
+    try:
+        if group:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+# ---------------------------------------
+# QUERIES
+# ---------------------------------------
+def read_status(job):
+    try:
+        return json.load(open(PROGRESS / f"{_safe_job(job)}.json"))
+    except (OSError, ValueError):
+        return None
+
+def list_status():
+    out = []
+    for p in sorted(PROGRESS.glob("*.json")):
+        try:
+            out.append(json.load(open(p)))
+        except (OSError, ValueError):
+            continue
+    return out
+
+def prune(max_age=KEEP_RECORDS):
+    cutoff = time.time() - max_age
+    for p in PROGRESS.glob("*.json"):
+        try:
+            if p.stat().st_mtime < cutoff:
+                p.unlink()
+        except OSError:
+            pass
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(read_status(sys.argv[1]), indent=2))
+    else:
+        print(json.dumps(list_status(), indent=2))
@@ -6,9 +6,12 @@
 
 import os
 import time
-import subprocess
 from pathlib import Path
 
+import encoder_bench
+import ffmpeg_runner
+import media_probe
+
 ROOT = Path.home() / "AI-AMV-STUDIO" / "storage"
 OUTPUT = ROOT / "output"
 TEMP = ROOT / "temp"
@@ -26,28 +29,48 @@ def log(msg):
 
 
 # ------------------------------------------------------------
-# ✔ SMART COMPRESSOR (CRF auto based on file size)
+# ✔ SMART COMPRESSOR (CRF auto based on bits per pixel)
 # ------------------------------------------------------------
-def compress_video(path):
-    orig_size = os.path.getsize(path)
-
-    # Auto CRF logic
-    if orig_size < 10 * 1024 * 1024:  # < 10MB
+TARGET_BITRATE = 1_000_000
+
+def pick_crf(path):
+    info = media_probe.video_info(path)
+    if not info or not (info["bitrate"] and info["width"] and info["fps"]):
+        # probe failed → old file-size heuristic
+        orig_size = os.path.getsize(path)
+        if orig_size < 10 * 1024 * 1024:  # < 10MB
+            return 25, None
+        if orig_size < 50 * 1024 * 1024:  # < 50MB
+            return 28, None
+        return 30, None
+
+    # bits per pixel per frame: how much headroom the source really has
+    bpp = info["bitrate"] / (info["width"] * info["height"] * info["fps"])
+    if bpp < 0.05:
         crf = 25
-    elif orig_size < 50 * 1024 * 1024:  # < 50MB
+    elif bpp < 0.12:
         crf = 28
     else:
         crf = 30
+    return crf, info
+
+def compress_video(path):
+    crf, info = pick_crf(path)
+    if info and info["bitrate"] <= TARGET_BITRATE and info["codec"] == "h264":
+        log(f"⏭ Already lean: {os.path.basename(path)} ({info['bitrate'] // 1000} kb/s)")
+        return
 
     out = path.replace(".mp4", "_optimized.mp4")
+    preset = encoder_bench.preset_for("optimize", crf, default="veryfast")
 
     cmd = (
-        f'ffmpeg -i "{path}" -vcodec libx264 -preset veryfast '
+        f'ffmpeg -i "{path}" -vcodec libx264 -preset {preset} '
         f"-crf {crf} -b:v 1M -bufsize 1M -threads 4 "
         f'-movflags +faststart "{out}" -y'
     )
 
-    subprocess.call(cmd, shell=True)
+    # live progress → storage/progress/<name>.json, hung encodes get killed
+    ffmpeg_runner.run(cmd, Path(out).stem, total=media_probe.duration(path), shell=True)
     log(f"✨ Optimized: {os.path.basename(out)} ({crf} CRF)")
 
 
@@ -63,13 +86,14 @@ def already_optimized(filename):
 # ------------------------------------------------------------
 def enhance_video(path):
     enhanced = path.replace(".mp4", "_enhanced.mp4")
+    preset = encoder_bench.preset_for("enhance", default="fast")
 
     # Basic FFmpeg sharpen filter (future upgrade: TensorPix API)
     cmd = (
         f'ffmpeg -i "{path}" -vf "unsharp=7:7:1.0:7:7:0.0" '
-        f'-c:v libx264 -preset fast "{enhanced}" -y'
+        f'-c:v libx264 -preset {preset} "{enhanced}" -y'
     )
-    subprocess.call(cmd, shell=True)
+    ffmpeg_runner.run(cmd, Path(enhanced).stem, total=media_probe.duration(path), shell=True)
 
     log(f"🔧 Enhanced: {os.path.basename(enhanced)}")
 
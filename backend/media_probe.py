@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — SHARED MEDIA PROBE ===
+# One ffprobe per file, cached on disk by (path, size, mtime)
+# Every stage asks here for duration / codec / resolution / fps / bitrate
+
+import os, sys, json, time, hashlib, subprocess
+from collections import OrderedDict
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+PROBE_CACHE = STORAGE / "cache" / "probe"
+
+# entries are keyed by (path, size, mtime): edited / deleted files leave
+# dead ones behind, so both levels are bounded LRUs
+MAX_ENTRIES = 5000  # on disk (mtime = last use)
+MEMO_MAX = 512      # in this process
+
+_memo = OrderedDict()
+
+def log(msg):
+    print(f"[PROBE] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+
+def _key(path):
+    st = os.stat(path)
+    sig = f"{os.path.realpath(path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(sig.encode()).hexdigest()
+
+# ---------------------------------------
+# RAW PROBE
+# ---------------------------------------
+def probe(path):
+    """
+    Full `ffprobe -show_format -show_streams` JSON for path, or None if the
+    file is missing or ffprobe cannot read it. Same (path, size, mtime) →
+    served from memory / disk without starting ffprobe.
+    """
+    try:
+        key = _key(path)
+    except OSError:
+        return None
+    if key in _memo:
+        _memo.move_to_end(key)
+        return _memo[key]
+
+    cache = PROBE_CACHE / f"{key}.json"
+    try:
+        info = json.load(open(cache))
+        _remember(key, info)
+        try:
+            os.utime(cache)  # LRU: mtime = last use
+        except OSError:
+            pass
+        return info
+    except Exception:
+        pass
+
+    cmd = ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", str(path)]
+    try:
+        res = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        info = json.loads(res.stdout) if res.returncode == 0 else None
+    except Exception as e:
+        log(f"⚠ ffprobe failed on {os.path.basename(str(path))}: {e}")
+        return None
+    if not info:
+        return None
+
+    PROBE_CACHE.mkdir(parents=True, exist_ok=True)
+    tmp = cache.with_name(f".{cache.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(info, f)
+    os.replace(tmp, cache)
+    _remember(key, info)
+    evict()
+    return info
+
+def _remember(key, info):
+    _memo[key] = info
+    while len(_memo) > MEMO_MAX:
+        _memo.popitem(last=False)
+
+def evict(max_entries=MAX_ENTRIES):
+    """Drop least recently used probe records beyond max_entries."""
+    entries = []
+    for p in PROBE_CACHE.glob("*.json"):
+        try:
+            entries.append((p.stat().st_mtime, p))
+        except OSError:
+            continue
+    if len(entries) <= max_entries:
+        return 0
+    entries.sort()
+    dropped = entries[:len(entries) - max_entries]
+    for _, p in dropped:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+    return len(dropped)
+
+# ---------------------------------------
+# CONVENIENCE QUERIES
+# ---------------------------------------
+def _stream(info, kind):
+    for s in (info or {}).get("streams", []):
+        if s.get("codec_type") == kind:
+            return s
+    return None
+
+def _float(v, default=0.0):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+def _rate(r):
+    # "30000/1001" → 29.97
+    try:
+        num, den = r.split("/")
+        return float(num) / float(den) if float(den) else 0.0
+    except (AttributeError, ValueError):
+        return _float(r)
+
+def duration(path):
+    """Container duration in seconds (0.0 if unknown)."""
+    info = probe(path)
+    if not info:
+        return 0.0
+    d = _float(info.get("format", {}).get("duration"))
+    if d <= 0:
+        d = max((_float(s.get("duration")) for s in info.get("streams", [])), default=0.0)
+    return d
+
+def has_stream(path, kind):
+    return _stream(probe(path), kind) is not None
+
+def video_info(path):
+    """
+    {duration, codec, width, height, fps, bitrate, size} for the first video
+    stream, or None when there is no readable video.
+    """
+    info = probe(path)
+    v = _stream(info, "video")
+    if v is None:
+        return None
+    fmt = info.get("format", {})
+    return {
+        "duration": duration(path),
+        "codec": v.get("codec_name"),
+        "width": int(v.get("width") or 0),
+        "height": int(v.get("height") or 0),
+        "fps": round(_rate(v.get("avg_frame_rate")) or _rate(v.get("r_frame_rate")), 3),
+        "bitrate": int(_float(v.get("bit_rate")) or _float(fmt.get("bit_rate"))),
+        "size": int(_float(fmt.get("size")))
+    }
+
+def audio_info(path):
+    """{duration, codec, sample_rate, channels, bitrate} or None."""
+    info = probe(path)
+    a = _stream(info, "audio")
+    if a is None:
+        return None
+    return {
+        "duration": duration(path),
+        "codec": a.get("codec_name"),
+        "sample_rate": int(_float(a.get("sample_rate"))),
+        "channels": int(a.get("channels") or 0),
+        "bitrate": int(_float(a.get("bit_rate")) or _float(info.get("format", {}).get("bit_rate")))
+    }
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: media_probe.py <file> [...]")
+        sys.exit(1)
+    for p in sys.argv[1:]:
+        print(json.dumps({"path": p, "video": video_info(p), "audio": audio_info(p)}, indent=2))
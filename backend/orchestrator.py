@@ -4,9 +4,13 @@
 #  Controls all AI models, planning, decisions, fail-safe
 # ============================================================
 
-import os, time, json, random, subprocess, traceback
+import os, time, json, subprocess, traceback
 from pathlib import Path
 
+import analysis_worker
+import effects
+import render_cache
+
 ROOT = Path.home() / "AI-AMV-STUDIO"
 STORAGE = ROOT / "storage"
 TEMP = STORAGE / "temp"
@@ -79,22 +83,37 @@ def load_task(path):
 def analyze_audio(task):
     log(f"🎵 AUDIO: Smart analysis for {task['id']}")
 
-    # Real audio analysis delegated to audio_analysis.py
+    # Real audio analysis: resident worker first, audio_analysis.py CLI fallback
+    # (streaming mode → constant memory even for hour-long mixes)
+    envelope_path = TEMP / f"{task['id']}_envelope.f32"
     try:
-        result = subprocess.check_output(
-            f'python3 {ROOT}/backend/audio_analysis.py "{task["audio"]}"',
-            shell=True
-        )
-        task["analysis"] = json.loads(result.decode())
+        try:
+            task["analysis"] = analysis_worker.call(
+                "analyze", {"path": task["audio"], "stream": True,
+                            "envelope_out": str(envelope_path)}
+            )
+        except (analysis_worker.WorkerError, OSError, ValueError) as e:
+            # worker down, broken pool or a failed call → one-shot CLI
+            if isinstance(e, analysis_worker.WorkerError):
+                log(f"⚠️ Worker analyze failed: {e} → CLI fallback")
+            result = subprocess.check_output(
+                ["python3", str(ROOT / "backend" / "audio_analysis.py"), "--stream",
+                 "--envelope", str(envelope_path), task["audio"]]
+            )
+            task["analysis"] = json.loads(result.decode())
+        if envelope_path.exists():
+            task["envelope"] = str(envelope_path)
     except:
         # fallback if script failed
+        rng = render_cache.rng_for(task, "fallback")
         task["analysis"] = {
-            "bpm": random.randint(90,180),
-            "mood": random.choice(list(MOOD_EFFECTS.keys())),
+            "bpm": rng.randint(90,180),
+            "mood": rng.choice(list(MOOD_EFFECTS.keys())),
             "error": "fallback_mode"
         }
 
-    log(f"✔️ BPM={task['analysis']['bpm']} | Mood={task['analysis']['mood']}")
+    cached = " (cache hit)" if task["analysis"].get("cached") else ""
+    log(f"✔️ BPM={task['analysis']['bpm']} | Mood={task['analysis']['mood']}{cached}")
     return task
 
 
@@ -116,26 +135,38 @@ def pick_clips(task):
 # ============================================================
 # STEP 3 — SUPREME EDIT PLAN GENERATOR
 # ============================================================
+BEATS_PER_CLIP = 8  # two bars of 4/4
+
 def generate_plan(task):
     mood = task["analysis"]["mood"]
     bpm = task["analysis"]["bpm"]
+    beats = task["analysis"].get("beats") or []
 
     log("🧩 PLAN: Creating Supreme Edit Plan...")
+    rng = render_cache.rng_for(task, "plan")  # same seed → same plan
 
     time_pos = 0
     plan = []
 
-    for c in task["clips"]:
+    for i, c in enumerate(task["clips"]):
+        # snap to the beat grid when the analyzer produced one
+        b = i * BEATS_PER_CLIP
+        if b + BEATS_PER_CLIP < len(beats):
+            start, end = beats[b], beats[b + BEATS_PER_CLIP]
+        else:
+            start, end = time_pos, time_pos + 4
+
         plan.append({
             "clip": c,
-            "start": time_pos,
-            "end": time_pos + 4,
-            "effect": random.choice(EFFECTS),
-            "transition": random.choice(TRANSITIONS),
-            "mood_fx": random.choice(MOOD_EFFECTS[mood]),
+            "start": start,
+            "end": end,
+            # drawn from the effect registry: unsupported names never reach a plan
+            "effect": effects.pick(EFFECTS, rng),
+            "transition": effects.pick(TRANSITIONS, rng),
+            "mood_fx": effects.pick(MOOD_EFFECTS[mood], rng),
             "beat_sync": bpm
         })
-        time_pos += 4
+        time_pos = end
 
     plan_path = TEMP / f"{task['id']}_auto_plan.json"
     json.dump(plan, open(plan_path, "w"), indent=2)
@@ -2,6 +2,8 @@
 import json, sys, os, time, subprocess
 from pathlib import Path
 
+import encoder_bench
+
 def sh(cmd):
     return subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
@@ -76,10 +78,11 @@ def main():
     # If user passed multiple video clips, concat. Else, re-encode single.
     out_name = f"preview_{int(time.time()*1000)}.mp4"
     out_path = output_dir / out_name
+    preset = encoder_bench.preset_for("preview", 25, default="ultrafast")
     if len(videos) > 1:
         concat_list = temp_dir / f"concat_{task['id']}.txt"
         concat_list.write_text("\n".join([f"file '{v}'" for v in videos]))
-        cmd = f'ffmpeg -y -f concat -safe 0 -i "{concat_list}" -c:v libx264 -preset ultrafast -crf 25 -c:a aac "{out_path}"'
+        cmd = f'ffmpeg -y -f concat -safe 0 -i "{concat_list}" -c:v libx264 -preset {preset} -crf 25 -c:a aac "{out_path}"'
         proc = sh(cmd)
         try: concat_list.unlink()
         except: pass
@@ -90,7 +93,7 @@ def main():
             print(proc.stderr.decode()[:500])
             sys.exit(3)
     elif len(videos) == 1:
-        cmd = f'ffmpeg -y -i "{videos[0]}" -c:v libx264 -preset ultrafast -crf 25 -c:a aac "{out_path}"'
+        cmd = f'ffmpeg -y -i "{videos[0]}" -c:v libx264 -preset {preset} -crf 25 -c:a aac "{out_path}"'
         proc = sh(cmd)
         if proc.returncode != 0:
             task["status"] = "error"
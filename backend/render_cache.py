@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — DETERMINISTIC PLANS + RENDER CACHE ===
+# Every random choice in a plan comes from random.Random(task seed), so the
+# same inputs always produce the same plan. The finished video is stored
+# under sha256(input fingerprints + plan + encoder args); a repeat render
+# is a hard link instead of an encode.
+
+import os, sys, json, time, random, shutil, hashlib
+from pathlib import Path
+
+import analysis_cache
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+RENDER_CACHE = STORAGE / "cache" / "render"
+
+# bump when the renderer changes what a given plan looks like
+RENDER_VERSION = 1
+MAX_BYTES = 20 * 1024 * 1024 * 1024
+
+def log(msg):
+    print(f"[RENDER-CACHE] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+
+# ---------------------------------------
+# SEEDS
+# ---------------------------------------
+def seed_for(task):
+    """
+    The task's plan seed, stored in task["seed"]. New tasks derive it from
+    their inputs, so re-submitting the same media yields the same plan.
+    """
+    if "seed" not in task:
+        inputs = task.get("inputs") or {}
+        blob = json.dumps({
+            "audio": task.get("audio") or inputs.get("audio"),
+            "video": task.get("video") or task.get("videos") or inputs.get("videos"),
+            "prompt": task.get("prompt"),
+        }, sort_keys=True)
+        task["seed"] = int(hashlib.sha256(blob.encode()).hexdigest()[:8], 16)
+    return task["seed"]
+
+def rng_for(task, stage):
+    """Independent, reproducible random stream per pipeline stage."""
+    return random.Random(f"{seed_for(task)}:{stage}")
+
+# ---------------------------------------
+# CACHE KEY
+# ---------------------------------------
+def fingerprint(path):
+    """Content hash of an input file (stat-indexed), or its path if missing."""
+    if path and os.path.isfile(path):
+        return analysis_cache.content_hash(path)
+    return f"missing:{path}"
+
+def render_key(inputs, plan, encoder):
+    blob = json.dumps({
+        "version": RENDER_VERSION,
+        "inputs": [fingerprint(p) for p in inputs],
+        "plan": plan,
+        "encoder": encoder,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+# ---------------------------------------
+# GET / PUT (hard links)
+# ---------------------------------------
+def _link(src, dest):
+    dest = Path(dest)
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)  # different filesystem → plain copy
+    os.replace(tmp, dest)
+
+def get(key, dest):
+    """Hard-link the cached render to dest. False on a miss."""
+    entry = RENDER_CACHE / f"{key}.mp4"
+    if not entry.exists():
+        return False
+    _link(entry, dest)
+    try:
+        os.utime(entry)  # LRU: mtime = last use
+    except OSError:
+        pass
+    return True
+
+def put(key, output):
+    RENDER_CACHE.mkdir(parents=True, exist_ok=True)
+    _link(output, RENDER_CACHE / f"{key}.mp4")
+    evict()
+
+def evict(max_bytes=MAX_BYTES):
+    """Drop least recently used renders until the cache fits max_bytes."""
+    entries = []
+    for p in RENDER_CACHE.glob("*.mp4"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    dropped = 0
+    while entries and total > max_bytes:
+        _, size, p = entries.pop(0)
+        try:
+            p.unlink()  # outputs linked elsewhere keep their own link
+        except OSError:
+            pass
+        total -= size
+        dropped += 1
+    if dropped:
+        log(f"🗑 Evicted {dropped} cached renders")
+    return dropped
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "clear"):
+        print("Usage: render_cache.py stats|clear")
+        sys.exit(1)
+
+    files = list(RENDER_CACHE.glob("*.mp4"))
+    if sys.argv[1] == "clear":
+        for p in files:
+            p.unlink()
+        log("🧹 Render cache cleared")
+    else:
+        print(json.dumps({"entries": len(files),
+                          "bytes": sum(p.stat().st_size for p in files)}, indent=2))
@@ -1,6 +1,10 @@
 import os, json, time, subprocess
 from pathlib import Path
 
+import encoder_bench
+import ffmpeg_runner
+import media_probe
+
 ROOT = Path(__file__).resolve().parent.parent
 STORAGE = ROOT / "storage"
 TEMP_DIR = STORAGE / "temp"
@@ -41,10 +45,12 @@ def render_video(plan_path):
         ffmpeg_cmd = [
             "ffmpeg", "-y", "-f", "concat", "-safe", "0",
             "-i", str(list_path),
-            "-c:v", "libx264", "-preset", "ultrafast", "-crf", "22",
+            "-c:v", "libx264", "-crf", "22",
+            "-preset", encoder_bench.preset_for("render", 22, default="ultrafast"),
             "-c:a", "aac", str(out_path)
         ]
-        subprocess.run(ffmpeg_cmd, capture_output=True)
+        total = sum(media_probe.duration(c) for c in clips) or None
+        ffmpeg_runner.run(ffmpeg_cmd, out_path.stem, total=total, stderr=subprocess.DEVNULL)
         os.remove(list_path)
 
         # effects simulation
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — TIMELINE → FILTERGRAPH COMPILER ===
+# Turns a compose `<task>_timeline.json` into ONE ffmpeg command:
+#   per-input -ss/-t (only the needed span is decoded), trim/setpts,
+#   registry effect chains + xfade transitions (effects.py),
+#   music track mapped + trimmed
+# Single decode → encode pass, no intermediate files.
+# Segmented mode: split at cuts, encode N segments in parallel,
+# stream-copy concat them and mux the music once.
+
+import os, sys, json, time, shutil, subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import effects
+import encoder_bench
+import ffmpeg_runner
+from timeline import Timeline
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+TEMP = STORAGE / "temp"
+OUTPUT = STORAGE / "output"
+
+RENDER_SIZE = (1280, 720)
+RENDER_FPS = 30
+XFADE = 0.25           # transition length (s), clamped to half the shorter block
+MUSIC_FADE_OUT = 1.0
+RENDER_CRF = 21
+ENCODE_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", str(RENDER_CRF),
+               "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "192k",
+               "-movflags", "+faststart"]
+
+# segment-parallel renders
+SEGMENT_RETRIES = 2
+MIN_SEGMENT = 10.0               # seconds; shorter segments are not worth a process
+SEGMENTED_MIN_DURATION = 300.0   # segments="auto": only edits at least this long
+SEGMENT_SNAP = 0.15              # look this far (fraction of a segment) for a hard cut
+
+def encode_args():
+    """ENCODE_ARGS with the preset the machine profile picks for renders."""
+    args = list(ENCODE_ARGS)
+    args[args.index("-preset") + 1] = encoder_bench.preset_for("render", RENDER_CRF)
+    return args
+
+def log(msg):
+    print(f"[GRAPH] {time.strftime('%H:%M:%S')} {msg}", file=sys.stderr, flush=True)
+
+# ---------------------------------------
+# COMPILE
+# ---------------------------------------
+def _num(x):
+    return f"{x:.3f}".rstrip("0").rstrip(".") or "0"
+
+def compile_timeline(timeline, music=None, source=None, size=RENDER_SIZE,
+                     fps=RENDER_FPS, xfade=XFADE):
+    """
+    Timeline (or its list form) → (input_args, filter_complex, map_args).
+
+    With `source` every block is read straight from the source video at
+    its scene time (-ss start -t duration); otherwise from its scene clip
+    starting at the block's "in" point (default 0). Each input is read
+    `xfade` seconds long so transitions overlap instead of shortening the
+    edit — output length == sum of block durations, in sync with music.
+    """
+    if not isinstance(timeline, Timeline):
+        timeline = Timeline.from_list(timeline)
+    blocks = [b for b in timeline if (source or b["clip"]) and b["end"] > b["start"]]
+    if not blocks:
+        raise ValueError("timeline has no renderable blocks")
+
+    # unsupported effects fail here, before any ffmpeg process starts
+    effects.validate(b["effect"] for b in blocks)
+
+    w, h = size
+    durs = [b["end"] - b["start"] for b in blocks]
+    # transition into block i lasts xf[i]; never more than half a neighbour
+    kinds = [None] + [effects.transition(blocks[i - 1]["effect"]) for i in range(1, len(blocks))]
+    xf = [0.0] + [min(xfade, durs[i - 1] / 2, durs[i] / 2) if kinds[i] else 0.0
+                  for i in range(1, len(blocks))]
+
+    inputs, chains = [], []
+    for i, b in enumerate(blocks):
+        tail = xf[i + 1] if i + 1 < len(blocks) else 0.0
+        length = durs[i] + tail
+        if source:
+            src, ss = source, b["start"]
+        else:
+            src, ss = b["clip"], b.get("in", 0)
+        inputs += ["-ss", _num(ss), "-t", _num(length), "-i", str(src)]
+        chains.append(
+            f"[{i}:v]trim=duration={_num(length)},setpts=PTS-STARTPTS,fps={fps},"
+            f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+            f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,format=yuv420p,"
+            f"{effects.chain(b['effect'] or 'none', w=w, h=h, fps=fps)},setsar=1,"
+            # short source clip → hold the last frame instead of drifting off the beat
+            f"tpad=stop_mode=clone:stop_duration={_num(length)},trim=duration={_num(length)},"
+            f"settb=1/{fps}[v{i}]"
+        )
+
+    # chain the blocks: xfade where a transition exists, concat otherwise.
+    # concat outputs timebase 1/1000000 and xfade needs equal timebases on
+    # both inputs → every block and every concat is pinned to 1/fps
+    last, t = "v0", durs[0]
+    for i in range(1, len(blocks)):
+        out = f"x{i}"
+        if xf[i] > 0:
+            chains.append(f"[{last}][v{i}]xfade=transition={kinds[i]}:duration={_num(xf[i])}:"
+                          f"offset={_num(t)}[{out}]")
+        else:
+            chains.append(f"[{last}][v{i}]concat=n=2:v=1:a=0,settb=1/{fps}[{out}]")
+        last, t = out, t + durs[i]
+    chains.append(f"[{last}]null[vout]")
+    total = t
+
+    maps = ["-map", "[vout]"]
+    if music:
+        a = len(blocks)
+        inputs += ["-t", _num(total), "-i", str(music)]
+        fade_at = max(0.0, total - MUSIC_FADE_OUT)
+        chains.append(f"[{a}:a]atrim=duration={_num(total)},asetpts=PTS-STARTPTS,"
+                      f"afade=t=out:st={_num(fade_at)}:d={_num(MUSIC_FADE_OUT)}[aout]")
+        maps += ["-map", "[aout]"]
+
+    return inputs, ";".join(chains), maps + ["-t", _num(total)]
+
+# ---------------------------------------
+# OUTPUT STAGING
+# ---------------------------------------
+# Outputs can be hard links into the render cache: never encode onto them
+# in place (-y truncates the shared inode). Encode next to the output and
+# os.replace it on success, which swaps in a fresh inode.
+def staged_path(output):
+    output = Path(output)
+    return output.with_name(f".{output.stem}.{os.getpid()}.tmp{output.suffix}")
+
+def publish(tmp, output, code):
+    """Move a finished encode onto output; drop it if ffmpeg failed."""
+    if code == 0 and tmp.exists():
+        os.replace(tmp, output)
+    else:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+    return code
+
+def build_cmd(timeline, output, music=None, source=None, **kw):
+    inputs, graph, maps = compile_timeline(timeline, music, source, **kw)
+    return (["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"] + inputs
+            + ["-filter_complex", graph] + maps + encode_args() + [str(output)])
+
+# ---------------------------------------
+# SEGMENT-PARALLEL RENDER
+# ---------------------------------------
+def _renderable(timeline, source):
+    if not isinstance(timeline, Timeline):
+        timeline = Timeline.from_list(timeline)
+    return [b for b in timeline if (source or b["clip"]) and b["end"] > b["start"]]
+
+def plan_segments(blocks, n, fps=RENDER_FPS):
+    """
+    Split blocks into ≤ n runs at cut points → [(blocks, frames), ...].
+
+    Splits only land on hard cuts (a split at a transition would drop its
+    xfade), the one nearest each equal-duration target; with no hard cut
+    left the edit gets fewer segments.
+    Boundaries are quantized to the output frame grid and each segment's
+    last block is stretched / trimmed by < 1 frame to match, so every cut
+    lands on the same frame as in a single-pass render and the video
+    stays in sync with the (unsegmented) music track.
+    """
+    starts = [0.0]
+    for b in blocks:
+        starts.append(starts[-1] + b["end"] - b["start"])
+    total = starts[-1]
+    n = max(1, min(n, int(total // MIN_SEGMENT), len(blocks)))
+
+    cuts, seg = [0], total / n
+    for k in range(1, n):
+        target = k * seg
+        hard = [i for i in range(cuts[-1] + 1, len(blocks))
+                if effects.transition(blocks[i - 1]["effect"]) is None]
+        near = [i for i in hard if abs(starts[i] - target) <= seg * SEGMENT_SNAP]
+        i = min(near or hard, key=lambda i: abs(starts[i] - target), default=None)
+        if i is None:
+            break
+        cuts.append(i)
+    cuts.append(len(blocks))
+
+    frames = [round(starts[i] * fps) for i in cuts]
+    out = []
+    for k in range(len(cuts) - 1):
+        part = [dict(b) for b in blocks[cuts[k]:cuts[k + 1]]]
+        n_frames = frames[k + 1] - frames[k]
+        if n_frames <= 0:
+            continue
+        have = starts[cuts[k + 1]] - starts[cuts[k]]
+        part[-1]["end"] += n_frames / fps - have
+        out.append((part, n_frames))
+    return out
+
+def _render_segment(idx, part, frames, path, source, threads, retries, fps=RENDER_FPS, **kw):
+    inputs, graph, maps = compile_timeline(part, None, source, fps=fps, **kw)
+    cmd = (["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"] + inputs
+           + ["-filter_complex", graph, "-map", "[vout]", "-frames:v", str(frames), "-an"]
+           + encode_args() + ["-threads", str(threads), "-f", "mpegts", str(path)])
+    for attempt in range(1 + retries):
+        started = time.time()
+        code = ffmpeg_runner.run(cmd, f"{path.parent.name}_{path.stem}", total=frames / fps)
+        if code == 0 and path.exists() and path.stat().st_size > 0:
+            return {"index": idx, "ok": True, "attempts": attempt + 1,
+                    "seconds": round(time.time() - started, 3)}
+        log(f"⚠ Segment {idx} failed (exit {code}), attempt {attempt + 1}/{1 + retries}")
+    return {"index": idx, "ok": False, "attempts": 1 + retries}
+
+def render_segmented(timeline, output, music=None, source=None, segments=None,
+                     workers=None, retries=SEGMENT_RETRIES, work_dir=None,
+                     fps=RENDER_FPS, **kw):
+    """
+    Encode the timeline as parallel segments, join them with the concat
+    demuxer (stream copy) and mux the music once over the whole edit.
+    Returns (exit_code, report).
+    """
+    blocks = _renderable(timeline, source)
+    if not blocks:
+        raise ValueError("timeline has no renderable blocks")
+    effects.validate(b["effect"] for b in blocks)
+
+    cores = os.cpu_count() or 1
+    parts = plan_segments(blocks, segments or cores, fps)
+    workers = max(1, min(workers or cores, len(parts)))
+    threads = max(1, cores // workers)  # split cores between encodes
+
+    work = Path(work_dir or TEMP / f"{Path(output).stem}_segments")
+    work.mkdir(parents=True, exist_ok=True)
+    paths = [work / f"seg_{i:03d}.ts" for i in range(len(parts))]
+    log(f"🧩 {len(blocks)} blocks → {len(parts)} segments × {threads} threads")
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_segment, i, part, frames, paths[i], source,
+                               threads, retries, fps=fps, **kw)
+                   for i, (part, frames) in enumerate(parts)]
+        report = [f.result() for f in futures]
+
+    failed = [r["index"] for r in report if not r["ok"]]
+    if failed:
+        log(f"❌ Segments failed: {failed}")
+        return 1, report
+
+    list_path = work / "concat.txt"
+    with open(list_path, "w") as f:
+        for p in paths:
+            f.write(f"file '{p.resolve()}'\n")
+
+    staged = staged_path(output)
+    total_frames = sum(frames for _, frames in parts)
+    total = total_frames / fps
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+           "-f", "concat", "-safe", "0", "-i", str(list_path)]
+    maps = ["-map", "0:v"]
+    if music:
+        fade_at = max(0.0, total - MUSIC_FADE_OUT)
+        cmd += ["-t", _num(total), "-i", str(music),
+                "-af", f"afade=t=out:st={_num(fade_at)}:d={_num(MUSIC_FADE_OUT)}"]
+        maps += ["-map", "1:a", "-c:a", "aac", "-b:a", "192k"]
+    cmd += maps + ["-c:v", "copy", "-frames:v", str(total_frames), "-t", _num(total),
+                   "-movflags", "+faststart", str(staged)]
+    code = publish(staged, Path(output),
+                   ffmpeg_runner.run(cmd, f"{Path(output).stem}_join", total=total))
+    log(f"🧵 Joined {len(parts)} segments in {time.time() - started:.1f}s (exit {code})")
+
+    if code == 0:
+        shutil.rmtree(work, ignore_errors=True)
+    return code, report
+
+def task_sources(task):
+    """(timeline list, music, source video) for a task dict."""
+    timeline = json.load(open(task["timeline"]))
+    music = task.get("audio") or (task.get("inputs") or {}).get("audio")
+    source = task.get("video")
+    if source and not os.path.exists(source):
+        source = None
+    return timeline, music, source
+
+def segment_count(timeline, segments):
+    """
+    Segments a render will use, or None for single pass (the default).
+    segments="auto" → one per core for edits ≥ SEGMENTED_MIN_DURATION.
+    """
+    if segments == "auto":
+        length = sum(b["end"] - b["start"] for b in timeline)
+        cores = os.cpu_count() or 1
+        segments = cores if length >= SEGMENTED_MIN_DURATION and cores >= 4 else None
+    return segments if segments and segments > 1 else None
+
+def segment_layout(timeline, source, segments):
+    """[[blocks, frames], ...] the render will be split into (None: single pass) — part of the render cache key."""
+    n = segment_count(timeline, segments)
+    if n is None:
+        return None
+    return [[len(part), frames] for part, frames in plan_segments(_renderable(timeline, source), n)]
+
+def render_timeline(task, output, segments=None):
+    """
+    Final render of task['timeline']. Returns ffmpeg's exit code.
+    segments > 1 or "auto" (opt-in, see segment_count) → render_segmented.
+    """
+    timeline, music, source = task_sources(task)
+    length = sum(b["end"] - b["start"] for b in timeline)
+    segments = segment_count(timeline, segments)
+    if segments:
+        code, report = render_segmented(timeline, output, music, source, segments)
+        task["segment_report"] = report
+        return code
+
+    staged = staged_path(output)
+    cmd = build_cmd(timeline, staged, music, source)
+    log(f"🎛 {len(timeline)} blocks → {Path(output).name}")
+    return publish(staged, Path(output), ffmpeg_runner.run(cmd, Path(output).stem, total=length))
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Compile a compose timeline into one ffmpeg render")
+    ap.add_argument("task", help="task JSON (with 'timeline') or a _timeline.json")
+    ap.add_argument("--out", help="output mp4 (default storage/output/render_<id>.mp4)")
+    ap.add_argument("--music", help="override music track")
+    ap.add_argument("--source", help="read blocks from this source video")
+    ap.add_argument("--segments", type=int, help="render N segments in parallel, then stream-copy concat")
+    ap.add_argument("--dry-run", action="store_true", help="print the graph, do not render")
+    args = ap.parse_args()
+
+    data = json.load(open(args.task))
+    if isinstance(data, list):
+        task = {"id": Path(args.task).stem.replace("_timeline", "")}
+        timeline, music, source = data, None, None
+    else:
+        task = data
+        timeline, music, source = task_sources(task)
+    music = args.music or music
+    source = args.source or source
+    out = args.out or OUTPUT / f"render_{task.get('id', 'timeline')}.mp4"
+
+    if args.segments and args.segments > 1:
+        if args.dry_run:
+            parts = plan_segments(_renderable(timeline, source), args.segments)
+            print(json.dumps([{"blocks": len(p), "frames": f} for p, f in parts], indent=2))
+            sys.exit(0)
+        code, report = render_segmented(timeline, out, music, source, args.segments)
+        print(json.dumps(report, indent=2))
+        sys.exit(code)
+
+    if args.dry_run:
+        cmd = build_cmd(timeline, out, music, source)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        print(graph.replace(";", ";\n"))
+        print("\n" + " ".join(c if " " not in c and ";" not in c else f"'{c}'" for c in cmd))
+        sys.exit(0)
+    staged = staged_path(out)
+    sys.exit(publish(staged, Path(out), subprocess.call(build_cmd(timeline, staged, music, source))))
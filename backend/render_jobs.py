@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# === AI-AMV-STUDIO — RENDER JOB LIFECYCLE ===
+# pending → claimed → rendering → done | failed
+#
+# storage/jobs/render/
+#   <task>.lease   fcntl-locked while a render_manager owns the job
+#                  (lock dies with the process → crashed jobs free up)
+#   <task>.json    current state + owner, rewritten atomically
+#   <task>.done    terminal markers, stamped with the task file's sig:
+#   <task>.failed  a loop skips the task only while the sig still matches,
+#                  so a rewritten task (compose adds its timeline) re-queues
+#
+# Any number of render_manager processes can share one queue.
+
+import os, sys, json, time, fcntl, socket
+from pathlib import Path
+
+ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
+STORAGE = ROOT / "storage"
+JOBS = STORAGE / "jobs" / "render"
+
+PENDING, CLAIMED, RENDERING, DONE, FAILED = "pending", "claimed", "rendering", "done", "failed"
+TERMINAL = (DONE, FAILED)
+
+def _write_json(path, obj):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp, path)
+
+def job_id(task_path):
+    return Path(task_path).stem
+
+def task_sig(task_path):
+    """mtime + size of the task file (None if gone) — what a marker was earned for."""
+    try:
+        st = os.stat(task_path)
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+# ---------------------------------------
+# STATE QUERIES
+# ---------------------------------------
+def is_finished(jid, sig=None):
+    """
+    True if a terminal marker exists (and, given sig, was written for it).
+    Never cached: `render_jobs.py reset` from another process must put the
+    job back in every running loop's queue.
+    """
+    for final in TERMINAL:
+        try:
+            marker = json.load(open(JOBS / f"{jid}.{final}"))
+        except FileNotFoundError:
+            continue
+        except Exception:
+            marker = {}  # torn / foreign marker: trust it only without a sig
+        if sig is None or marker.get("sig") == sig:
+            return True
+    return False
+
+def _locked(jid):
+    """True if some live process holds the lease."""
+    try:
+        fd = os.open(JOBS / f"{jid}.lease", os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+def state(jid):
+    if (JOBS / f"{jid}.done").exists():
+        return DONE
+    if (JOBS / f"{jid}.failed").exists():
+        return FAILED
+    if not _locked(jid):
+        return PENDING  # never claimed, or the owner died mid-render
+    try:
+        return json.load(open(JOBS / f"{jid}.json")).get("state", CLAIMED)
+    except Exception:
+        return CLAIMED
+
+def pending(task_paths):
+    """Task paths not yet finished for their current content (a stat + marker reads each)."""
+    return [p for p in task_paths if not is_finished(job_id(p), task_sig(p))]
+
+# ---------------------------------------
+# CLAIM
+# ---------------------------------------
+class Claim:
+    """
+    Exclusive hold on one render job. Use as a context manager; leaving
+    the block without done()/failed() releases the job back to pending.
+    """
+
+    def __init__(self, jid, fd, task_path=None):
+        self.jid = jid
+        self.task_path = task_path
+        self._fd = fd
+        self.state = CLAIMED
+        self._record({})
+
+    def _record(self, info):
+        rec = {"state": self.state, "pid": os.getpid(), "host": socket.gethostname(),
+               "at": time.time()}
+        rec.update(info)
+        _write_json(JOBS / f"{self.jid}.json", rec)
+
+    def rendering(self, **info):
+        self.state = RENDERING
+        self._record(info)
+
+    def done(self, **info):
+        self._finish(DONE, info)
+
+    def failed(self, error, **info):
+        self._finish(FAILED, dict(info, error=str(error)))
+
+    def _finish(self, final, info):
+        self.state = final
+        self._record(info)
+        # sig taken now, after the render rewrote its task file
+        marker = {"at": time.time(), **info}
+        if self.task_path is not None:
+            marker["sig"] = task_sig(self.task_path)
+        _write_json(JOBS / f"{self.jid}.{final}", marker)
+        # one marker per job: a stale one must not outlive the new verdict
+        for other in TERMINAL:
+            if other != final:
+                try:
+                    (JOBS / f"{self.jid}.{other}").unlink()
+                except OSError:
+                    pass
+        self.release()
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def claim(jid, task_path=None):
+    """
+    Claim or None if finished / owned by another process. With task_path,
+    only a marker stamped with the file's current sig counts as finished.
+    """
+    sig = None if task_path is None else task_sig(task_path)
+    if is_finished(jid, sig):
+        return None
+    JOBS.mkdir(parents=True, exist_ok=True)
+    fd = os.open(JOBS / f"{jid}.lease", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    # someone may have finished it between our check and the lock
+    if is_finished(jid, sig):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+        return None
+    return Claim(jid, fd, task_path)
+
+def reset(jid):
+    """Put a finished / failed job back in the queue."""
+    for suffix in (".done", ".failed", ".json"):
+        try:
+            (JOBS / f"{jid}{suffix}").unlink()
+        except OSError:
+            pass
+
+# ---------------------------------------
+# CLI
+# ---------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "reset":
+        for jid in sys.argv[2:]:
+            reset(jid)
+            print(f"↺ {jid} → pending")
+        sys.exit(0)
+
+    jids = sorted({p.stem for p in JOBS.glob("*.lease")}) if JOBS.exists() else []
+    print(json.dumps({jid: state(jid) for jid in jids}, indent=2))
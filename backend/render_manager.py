@@ -1,6 +1,13 @@
-import os, json, time, subprocess, random
+import os, json, time, shutil, random
 from pathlib import Path
 
+import effects
+import ffmpeg_runner
+import media_probe
+import render_graph
+import render_jobs
+import render_cache
+
 # ==========================================================
 #   🎞️ SUPREME RENDER MANAGER — CREATIVE FUSION ENGINE v4
 #   Smart render system with auto-repair, transitions,
@@ -26,11 +33,16 @@ def log(msg):
 # ==========================================================
 #   🔍 Detect pending tasks
 # ==========================================================
+# files next to task_<id>.json that share its prefix but are not tasks
+TASK_SIDECARS = ("_timeline", "_auto_plan")
+
 def detect_tasks():
-    return [
+    # done / failed jobs drop out here: a stat of the task + its marker,
+    # re-queued once the task file changes (see render_jobs.is_finished)
+    return render_jobs.pending(
         p for p in TEMP.glob("task_*.json")
-        if "_auto_plan" not in p.name
-    ]
+        if not p.stem.endswith(TASK_SIDECARS)
+    )
 
 
 # ==========================================================
@@ -69,7 +81,7 @@ FPS_OPTIONS = [24, 30, 48, 60]
 # ==========================================================
 #   🎥 Build advanced render command (Fusion Engine)
 # ==========================================================
-def build_render_cmd(clips, output):
+def build_render_cmd(clips, output, rng=random):
 
     # Input clips
     input_string = " ".join([f"-i {c}" for c in clips])
@@ -77,14 +89,14 @@ def build_render_cmd(clips, output):
     # Dynamic visual mixing
     filters = []
     for i, clip in enumerate(clips):
-        fx = random.choice(EFFECTS)
-        filters.append(f"[{i}:v]{fx}=1[v{i}]")
+        fx = effects.pick(EFFECTS, rng)
+        filters.append(f"[{i}:v]{effects.chain(fx)}[v{i}]")
 
     # Smart concat
     concat_inputs = "".join(f"[v{i}]" for i in range(len(clips)))
     concat_filter = f"{';'.join(filters)}; {concat_inputs}concat=n={len(clips)}:v=1[outv]"
 
-    fps = random.choice(FPS_OPTIONS)
+    fps = rng.choice(FPS_OPTIONS)
 
     return f"""
     ffmpeg {input_string} -filter_complex "{concat_filter}" \
@@ -95,9 +107,19 @@ def build_render_cmd(clips, output):
 # ==========================================================
 #   ✔ Check render quality
 # ==========================================================
+MIN_DURATION = 1.0  # seconds of actual video
+MIN_HEIGHT = 240
+
 def check_video(path):
     path = Path(path)
-    return path.exists() and path.stat().st_size > 200_000  # 200 KB minimum
+    if not path.exists():
+        return False
+    info = media_probe.video_info(path)
+    if info is None:
+        # no ffprobe on this box → old size heuristic; otherwise ffprobe
+        # could not read the file (or found no video) → broken render
+        return shutil.which("ffprobe") is None and path.stat().st_size > 200_000
+    return info["duration"] >= MIN_DURATION and info["height"] >= MIN_HEIGHT
 
 
 # ==========================================================
@@ -109,7 +131,7 @@ def re_render(task):
 
     out = OUTPUT / f"recover_{tid}.mp4"
     cmd = f"ffmpeg -f lavfi -i color=c=black:s=720x480:d=4 -y {out}"
-    subprocess.call(cmd, shell=True)
+    ffmpeg_runner.run(cmd, out.stem, total=4, shell=True)
 
     if check_video(out):
         log("✅ Recovery successful")
@@ -128,20 +150,55 @@ def render_task(task):
     log(f"🎞 Rendering Task: {tid}")
 
     mood = task.get("analysis", {}).get("mood", "default")
-
-    # Using fake sample clips for demo
-    clips = [f"/sample_clips/{mood}_{i}.mp4" for i in range(1, 4)]
-
     output_path = OUTPUT / f"render_{tid}.mp4"
-    cmd = build_render_cmd(clips, output_path)
-
-    log("🎛 Running Fusion Render Engine…")
-    subprocess.call(cmd, shell=True)
-
-    # Quality check
-    if check_video(output_path):
+    rng = render_cache.rng_for(task, "render")  # seeded → same task, same render
+    task.pop("render_cache", None)
+
+    if task.get("timeline") and Path(task["timeline"]).exists():
+        timeline, music, source = render_graph.task_sources(task)
+        inputs = sorted({b["clip"] for b in timeline if b.get("clip")} | {music, source} - {None})
+        plan = timeline
+        encoder = {"args": render_graph.encode_args(), "size": render_graph.RENDER_SIZE,
+                   "fps": render_graph.RENDER_FPS, "xfade": render_graph.XFADE,
+                   "segments": render_graph.segment_layout(timeline, source, task.get("render_parallel"))}
+    else:
+        # Using fake sample clips for demo
+        clips = [f"/sample_clips/{mood}_{i}.mp4" for i in range(1, 4)]
+        cmd = build_render_cmd(clips, output_path, rng)
+        inputs, plan, encoder = clips, cmd, None  # cmd already holds fx + fps
+
+    key = render_cache.render_key(inputs, plan, encoder)
+    code = None
+    if render_cache.get(key, output_path) and check_video(output_path):
+        log(f"⚡ Render cache hit → {output_path.name} (hard link, no encode)")
+        task["render_cache"] = "hit"
+        code = 0
+    else:
+        # a render_<id>.mp4 from an earlier plan (re-render, render_jobs reset)
+        # must never pass the quality check below; it may also be a hard
+        # link into the render cache, so drop the link, never truncate it
+        output_path.unlink(missing_ok=True)
+        if task.get("timeline") and Path(task["timeline"]).exists():
+            # compose timeline → one filter_complex, single decode/encode pass
+            log("🎛 Compiling timeline → single-pass render…")
+            try:
+                # render_parallel: segment count or "auto" (unset → single pass)
+                code = render_graph.render_timeline(task, output_path, task.get("render_parallel"))
+            except (ValueError, KeyError, OSError) as e:
+                log(f"⚠️ Timeline compile failed: {e}")
+        else:
+            log("🎛 Running Fusion Render Engine…")
+            code = ffmpeg_runner.run(cmd, output_path.stem, shell=True)
+        if code:
+            log(f"❌ ffmpeg exited {code}")
+
+    # Quality check (only on a file this run linked or encoded)
+    if code == 0 and check_video(output_path):
         log(f"✅ Final Render OK → {output_path}")
         task["final_video"] = str(output_path)
+        if task.get("render_cache") != "hit":
+            render_cache.put(key, output_path)
+            task["render_cache"] = "stored"
     else:
         log("⚠ Low quality detected — switching to Recovery Mode")
         task = re_render(task)
@@ -158,6 +215,8 @@ def render_task(task):
 # ==========================================================
 def start_loop():
     log("🚀 Supreme Render Manager ACTIVE (Fusion + Creative Mode)")
+    # probe ffmpeg's filter list once (cached on disk per ffmpeg binary)
+    log(f"🎨 Effects usable: {len(effects.supported(effects.EFFECTS))}/{len(effects.EFFECTS)}")
     while True:
         tasks = detect_tasks()
 
@@ -167,10 +226,26 @@ def start_loop():
             continue
 
         for p in tasks:
-            task = safe_load(p)
-            if not task:
-                continue
-            render_task(task)
+            job = render_jobs.claim(render_jobs.job_id(p), p)
+            if not job:
+                continue  # another render_manager owns it / just finished it
+            with job:
+                task = safe_load(p)
+                if not task:
+                    # often a task file caught mid-write: leaving the block
+                    # releases the claim, so a later pass retries it
+                    continue
+                job.rendering(task=task["id"])
+                try:
+                    task = render_task(task)
+                except Exception as e:
+                    log(f"🔥 Render crashed {task['id']}: {e}")
+                    job.failed(e)
+                    continue
+                if task.get("final_video"):
+                    job.done(output=task["final_video"])
+                else:
+                    job.failed("quality check failed", recovered=task.get("recovered_output"))
 
         time.sleep(5)
 
@@ -2,13 +2,42 @@
 # AI-AMV-STUDIO — Scene Splitter (Creative Boss friendly)
 # Simple, fast, Termux-friendly scene detection using ffmpeg scene filter
 
-import os, sys, json, time, subprocess
+import os, sys, json, time, hashlib, subprocess
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import encoder_bench
+import media_probe
+
 ROOT = Path(os.path.expanduser("~/AI-AMV-STUDIO"))
 STORAGE = ROOT / "storage"
 TEMP = STORAGE / "temp"
 OUTPUT = STORAGE / "output"
+KEYFRAME_CACHE = STORAGE / "cache" / "keyframes"
+SCORE_CACHE = STORAGE / "cache" / "scene_scores"
+
+# streaming detection: rewrite the task JSON at most this often (seconds)
+PROGRESS_EVERY = 2.0
+
+# thumbnail sprites: one cell every SPRITE_INTERVAL s + one per cut
+SPRITES = STORAGE / "sprites"
+SPRITE_INTERVAL = 5
+SPRITE_CELL = (160, 90)
+SPRITE_GRID = (10, 10)
+
+# time-chunked parallel detection for long sources
+CHUNK_OVERLAP = 2.0           # seconds of context decoded before/after each range
+CHUNKED_MIN_DURATION = 1200   # "scene_chunks": "auto" kicks in above 20 min
+CUT_DEDUP = 0.02              # same cut seen by two chunks → keep one
+CHUNK_RETRIES = 1             # a failed range is decoded again this many times
+
+# fast detection: score a small, frame-rate-limited proxy instead of full res
+FAST_WIDTH = 320
+FAST_FPS = 12
+
+# copy mode: boundaries may move at most this far to land on a keyframe
+MAX_KEYFRAME_SNAP = 1.0
 
 def log(msg):
     print(f"[SCENE] {time.strftime('%H:%M:%S')} {msg}", flush=True)
@@ -17,84 +46,635 @@ def ensure_dirs():
     for d in (STORAGE, TEMP, OUTPUT):
         d.mkdir(parents=True, exist_ok=True)
 
-def detect_scenes_ffmpeg(video_path, threshold=0.4):
+# ---------------------------------------
+# SCENE SCORES (decode once, threshold in Python)
+# ---------------------------------------
+def _source_sig(video_path):
+    st = os.stat(video_path)
+    return f"{os.path.realpath(video_path)}|{st.st_size}|{st.st_mtime_ns}"
+
+def _score_cache_path(video_path, variant="full"):
+    key = hashlib.sha1(f"{_source_sig(video_path)}|{variant}".encode()).hexdigest()
+    return SCORE_CACHE / f"{key}.json"
+
+def sprite_dir_for(video_path, mode="full", threshold=0.4):
+    """Sprite sheets depend only on the source (+ mode, threshold): shared by every task."""
+    key = hashlib.sha1(f"{_source_sig(video_path)}|{mode}|{threshold}".encode()).hexdigest()
+    return SPRITES / key
+
+def parse_scene_metadata(lines):
     """
-    Uses ffmpeg scene detection filter to output timestamps.
-    Returns list of (start_sec, end_sec) tuples (approx).
+    Parse metadata=print output:
+        frame:12   pts:12288   pts_time:0.512
+        lavfi.scene_score=0.031250
+    Yields (pts_time, score).
+    """
+    t = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("frame:"):
+            for part in line.split():
+                if part.startswith("pts_time:"):
+                    try:
+                        t = float(part.split(":", 1)[1])
+                    except ValueError:
+                        t = None
+        elif line.startswith("lavfi.scene_score=") and t is not None:
+            try:
+                yield t, float(line.split("=", 1)[1])
+            except ValueError:
+                pass
+            t = None
+
+def _graph_escape(value):
+    """Option value inside -filter_complex: escaped for the option AND graph parser."""
+    value = value.replace("\\", "\\\\\\\\")
+    for ch in "':":
+        value = value.replace(ch, "\\\\" + ch)
+    return value
+
+def scene_score_cmd(video_path, mode="full", sprite=None, start=None, length=None, threads=None):
+    """
+    mode="full" scores every frame at source resolution.
+    mode="fast" skips the loop filter, drops to FAST_FPS and FAST_WIDTH before
+    the scene filter — a fraction of the pixel work on 1080p/4K sources.
+    sprite={"dir", "threshold"} adds a second branch on the same decoded
+    frames that tiles thumbnails into dir/sheet_NNN.jpg (see sprite_index).
+    start/length limit the decode to one time range (pts_time is then
+    relative to start).
+    """
+    # every frame passes select, metadata=print dumps its scene score to stdout
+    # (file=- is stdout; "pipe\:1" loses its escape in the graph parser and
+    # becomes a file named "pipe"; direct=1: unbuffered, so the streaming
+    # reader sees each line as it is made)
+    score = "select='gte(scene,0)',metadata=print:key=lavfi.scene_score:file=-:direct=1"
+    pre = f"fps={FAST_FPS},scale={FAST_WIDTH}:-2," if mode == "fast" else ""
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-loglevel", "error"]
+    if mode == "fast":
+        cmd += ["-skip_loop_filter", "all", "-flags2", "+fast"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    if length:
+        cmd += ["-t", f"{length:.3f}"]
+    cmd += ["-i", video_path, "-an"]
+
+    if not sprite:
+        return cmd + ["-vf", pre + score, "-f", "null", "-"]
+
+    w, h = SPRITE_CELL
+    cols, rows = SPRITE_GRID
+    meta = _graph_escape(str(Path(sprite["dir"]) / "thumbs.txt"))
+    pick = (
+        f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{SPRITE_INTERVAL})"
+        f"+gt(scene,{sprite['threshold']})'"
+    )
+    graph = (
+        f"[0:v]{pre}split=2[sc][th];"
+        f"[sc]{score}[scored];"
+        f"[th]{pick},metadata=print:key=lavfi.scene_score:file={meta},"
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,tile={cols}x{rows}[sheet]"
+    )
+    return cmd + [
+        "-filter_complex", graph,
+        "-map", "[scored]", "-f", "null", "-",
+        "-map", "[sheet]", "-fps_mode", "passthrough", "-q:v", "4",
+        "-y", str(Path(sprite["dir"]) / "sheet_%03d.jpg")
+    ]
+
+def sprite_index(sprite_dir, threshold):
+    """
+    index.json for the frontend: cell size, grid, sheet files and for every
+    thumbnail its time, sheet and pixel offset (+ whether it marks a cut).
+    """
+    sprite_dir = Path(sprite_dir)
+    w, h = SPRITE_CELL
+    cols, rows = SPRITE_GRID
+    try:
+        with open(sprite_dir / "thumbs.txt") as f:
+            thumbs = list(parse_scene_metadata(f))
+    except OSError:
+        thumbs = []
+
+    per_sheet = cols * rows
+    index = {
+        "cell": [w, h],
+        "grid": [cols, rows],
+        "interval": SPRITE_INTERVAL,
+        "sheets": sorted(p.name for p in sprite_dir.glob("sheet_*.jpg")),
+        "thumbs": [
+            {
+                "t": round(t, 3),
+                "sheet": i // per_sheet,
+                "x": (i % per_sheet) % cols * w,
+                "y": (i % per_sheet) // cols * h,
+                "cut": sc > threshold
+            }
+            for i, (t, sc) in enumerate(thumbs)
+        ]
+    }
+    # index.json marks the set complete for every task on this source → write atomically
+    tmp = sprite_dir / f".index.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, sprite_dir / "index.json")
+    return sprite_dir / "index.json"
+
+def scene_scores(video_path, mode="full", cache=True):
+    """
+    Per-frame lavfi.scene_score series [(t, score), ...] plus duration,
+    from ONE decode. Cached per (path, size, mtime, mode) so any later
+    threshold or top-K selection is free. cache=False always decodes
+    (the result is still saved).
     """
     if not os.path.exists(video_path):
         raise FileNotFoundError(video_path)
 
-    cmd = (
-        f'ffmpeg -hide_banner -loglevel error -i "{video_path}" '
-        f'-vf "select=gt(scene\\,{threshold}),showinfo" -f null - 2>&1'
+    if cache:
+        cached = cached_scene_scores(video_path, mode)
+        if cached is not None:
+            return cached
+
+    proc = subprocess.run(scene_score_cmd(video_path, mode), capture_output=True, text=True)
+    series = [(round(t, 3), round(sc, 4)) for t, sc in parse_scene_metadata(proc.stdout.splitlines())]
+    duration = get_duration(video_path)
+    if proc.returncode == 0:
+        save_scene_scores(video_path, series, duration, mode)
+    else:
+        # a failed / killed decode is empty or truncated → never cache it
+        log(f"⚠ Scene scoring exited rc={proc.returncode}: {proc.stderr.strip()[-200:]}")
+    return series, duration
+
+def cached_scene_scores(video_path, mode="full"):
+    """(series, duration) if this source was already scored, else None."""
+    try:
+        data = json.load(open(_score_cache_path(video_path, mode)))
+        return [tuple(p) for p in data["scores"]], data["duration"]
+    except Exception:
+        return None
+
+def iter_scene_scores(video_path, mode="full", sprite=None, status=None):
+    """
+    Yield (t, score) while ffmpeg is still decoding — nothing is buffered.
+    If status is a dict, status["returncode"] holds ffmpeg's exit code once
+    the iterator is exhausted (or closed early).
+    """
+    proc = subprocess.Popen(
+        scene_score_cmd(video_path, mode, sprite),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
     )
-    proc = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    out = proc.stderr
-
-    times = []
-    # parse pts_time from showinfo lines
-    for line in out.splitlines():
-        if "pts_time" in line:
-            # try to extract pts_time=VALUE
-            try:
-                part = [p for p in line.split() if "pts_time" in p][0]
-                t = float(part.split('=')[1])
-                times.append(t)
-            except:
-                continue
+    try:
+        for t, sc in parse_scene_metadata(proc.stdout):
+            yield round(t, 3), round(sc, 4)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()  # consumer stopped early
+        proc.wait()
+        if status is not None:
+            status["returncode"] = proc.returncode
 
-    if not times:
-        # fallback: split into 5s chunks for short demo
-        import math
+def stream_scene_cuts(video_path, threshold=0.4, mode="full", on_progress=None,
+                      duration=None, sprite_dir=None):
+    """
+    Streaming detection: yields each cut time as soon as ffmpeg reaches it.
+    on_progress(t, duration, cuts) is called at most every PROGRESS_EVERY s.
+    The full series is cached at the end, exactly like scene_scores().
+    sprite_dir → the thumbnail sprite sheet is built in the same decode.
+    """
+    if duration is None:
         duration = get_duration(video_path)
-        if duration <= 0:
-            return []
-        step = 4
-        chunks = []
-        t = 0.0
-        while t < duration:
-            chunks.append((t, min(duration, t + step)))
-            t += step
-        return chunks
+    sprite = None
+    if sprite_dir:
+        Path(sprite_dir).mkdir(parents=True, exist_ok=True)
+        for old in Path(sprite_dir).glob("sheet_*.jpg"):
+            old.unlink()
+        sprite = {"dir": sprite_dir, "threshold": threshold}
+    series, cuts, status = [], [], {}
+    last = 0.0
+    for t, sc in iter_scene_scores(video_path, mode, sprite, status):
+        series.append((t, sc))
+        if sc > threshold:
+            cuts.append(t)
+            yield t
+        if on_progress and time.time() - last >= PROGRESS_EVERY:
+            last = time.time()
+            on_progress(t, duration, cuts)
+    if status.get("returncode") != 0:
+        # failed decode: no score cache and no index.json (it marks the sprite set complete)
+        log(f"⚠ Streaming scene scoring exited rc={status.get('returncode')}")
+        return
+    save_scene_scores(video_path, series, duration, mode)
+    if sprite_dir:
+        sprite_index(sprite_dir, threshold)
+    if on_progress:
+        on_progress(duration, duration, cuts)
 
+def chunk_ranges(duration, chunks):
+    """Split [0, duration) into `chunks` equal owned ranges."""
+    step = duration / chunks
+    return [(i * step, duration if i == chunks - 1 else (i + 1) * step) for i in range(chunks)]
+
+def _score_range(video_path, mode, a, b, threads):
+    # decode [a - overlap, b + overlap] so edge cuts see their previous frame,
+    # but keep only the scores this chunk owns: a <= t < b
+    # None if ffmpeg failed on every attempt (never a silent gap)
+    start = max(0.0, a - CHUNK_OVERLAP)
+    cmd = scene_score_cmd(video_path, mode, start=start,
+                          length=(b + CHUNK_OVERLAP) - start, threads=threads)
+    for attempt in range(1 + CHUNK_RETRIES):
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode == 0:
+            return [
+                (round(start + t, 3), round(sc, 4))
+                for t, sc in parse_scene_metadata(proc.stdout.splitlines())
+                if a <= start + t < b
+            ]
+        log(f"⚠ Chunk {a:.1f}-{b:.1f}s failed (rc={proc.returncode}), "
+            f"attempt {attempt + 1}/{1 + CHUNK_RETRIES}")
+    return None
+
+def merge_chunk_series(parts):
+    """Concatenate per-chunk series in time order, dropping edge duplicates."""
+    merged = []
+    for part in parts:
+        for t, sc in part:
+            if merged and t - merged[-1][0] < CUT_DEDUP:
+                if sc > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], sc)
+                continue
+            merged.append((t, sc))
+    return merged
+
+def chunked_scene_scores(video_path, mode="full", chunks=None, on_progress=None, cache=True):
+    """
+    Score series for long sources: K overlapping time ranges are decoded by
+    K ffmpeg processes in parallel, then merged. Cached as its own variant.
+    on_progress(done_chunks, total_chunks) after each range finishes.
+    cache=False always decodes (the result is still saved).
+    """
+    variant = f"{mode}-chunked"
+    cached = cached_scene_scores(video_path, variant) if cache else None
+    if cached is not None:
+        return cached
+
+    duration = get_duration(video_path)
+    cores = os.cpu_count() or 1
+    chunks = max(1, int(chunks or cores))
+    if duration <= 0 or chunks == 1:
+        return scene_scores(video_path, mode, cache)
+
+    ranges = chunk_ranges(duration, chunks)
+    threads = max(1, cores // chunks)
+    parts = [None] * chunks
+    with ThreadPoolExecutor(max_workers=chunks) as pool:
+        futures = {
+            pool.submit(_score_range, video_path, mode, a, b, threads): i
+            for i, (a, b) in enumerate(ranges)
+        }
+        done = 0
+        for fut in as_completed(futures):
+            parts[futures[fut]] = fut.result()
+            done += 1
+            if on_progress:
+                on_progress(done, chunks)
+
+    failed = [i for i, part in enumerate(parts) if part is None]
+    if failed:
+        # a merge with holes must not be cached → one sequential pass instead
+        log(f"⚠ Chunks {failed} failed → sequential detection")
+        return scene_scores(video_path, mode, cache)
+
+    series = merge_chunk_series(parts)
+    save_scene_scores(video_path, series, duration, variant)
+    return series, duration
+
+def write_task(task_json_path, task):
+    # atomic: the monitor / compose may read the task while we are writing
+    tmp = f"{task_json_path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(task, f, indent=2)
+    os.replace(tmp, task_json_path)
+
+def save_scene_scores(video_path, series, duration, variant="full"):
+    SCORE_CACHE.mkdir(parents=True, exist_ok=True)
+    cache = _score_cache_path(video_path, variant)
+    tmp = cache.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"source": _source_sig(video_path), "duration": duration,
+                   "scores": series}, f)
+    os.replace(tmp, cache)
+
+def cuts_at_threshold(series, threshold):
+    """Same cut set as select=gt(scene,threshold)."""
+    return [t for t, sc in series if sc > threshold]
+
+def top_k_cuts(series, k, min_gap=1.0):
+    """Adaptive selection: the k strongest scene changes at least min_gap apart."""
+    picked = []
+    for t, sc in sorted(series, key=lambda p: p[1], reverse=True):
+        if len(picked) >= k or sc <= 0:
+            break
+        if all(abs(t - p) >= min_gap for p in picked):
+            picked.append(t)
+    return sorted(picked)
+
+def compare_cuts(cuts, reference, tol=0.5):
+    """
+    How far cuts (e.g. fast mode) deviate from reference (full-res) cuts.
+    A cut matches the nearest reference cut within tol seconds.
+    """
+    devs, matched = [], set()
+    for t in cuts:
+        i = bisect_left(reference, t)
+        near = [j for j in (i - 1, i) if 0 <= j < len(reference) and j not in matched]
+        if not near:
+            continue
+        j = min(near, key=lambda j: abs(reference[j] - t))
+        if abs(reference[j] - t) <= tol:
+            matched.add(j)
+            devs.append(abs(reference[j] - t))
+    return {
+        "cuts": len(cuts),
+        "reference_cuts": len(reference),
+        "matched": len(devs),
+        "missed": len(reference) - len(devs),
+        "extra": len(cuts) - len(devs),
+        "recall": round(len(devs) / len(reference), 3) if reference else 1.0,
+        "mean_dev": round(sum(devs) / len(devs), 3) if devs else 0.0,
+        "max_dev": round(max(devs), 3) if devs else 0.0
+    }
+
+def detection_accuracy(video_path, threshold=0.4, tol=0.5, candidate="fast", chunks=None):
+    """
+    candidate ("fast" proxy or "chunked" parallel) vs sequential full-res
+    detection on one source: wall time of each + cut deviation.
+    Both sides are decoded fresh: a cached series would time as ~0 s.
+    """
+    report = {}
+    cuts = {}
+    for name in (candidate, "full"):
+        started = time.time()
+        if name == "chunked":
+            series, _ = chunked_scene_scores(video_path, "full", chunks, cache=False)
+        else:
+            series, _ = scene_scores(video_path, name, cache=False)
+        report[f"{name}_seconds"] = round(time.time() - started, 2)
+        cuts[name] = cuts_at_threshold(series, threshold)
+    report.update(compare_cuts(cuts[candidate], cuts["full"], tol))
+    return report
+
+def intervals_from_cuts(cuts, duration):
     # convert timestamps to intervals (start, end)
     intervals = []
     prev = 0.0
-    for t in times:
+    for t in cuts:
+        if t <= prev:
+            continue
         intervals.append((prev, t))
         prev = t
     # last chunk
-    duration = get_duration(video_path)
     if duration and prev < duration:
         intervals.append((prev, duration))
     return intervals
 
+def fixed_chunks(duration, step=4):
+    # fallback: split into 4s chunks for short demo
+    if duration <= 0:
+        return []
+    chunks = []
+    t = 0.0
+    while t < duration:
+        chunks.append((t, min(duration, t + step)))
+        t += step
+    return chunks
+
+def detect_scenes_ffmpeg(video_path, threshold=0.4, top_k=None, mode="full"):
+    """
+    Scene intervals from the (cached) per-frame score series.
+    top_k → adaptive selection of the k strongest cuts instead of a threshold.
+    mode="fast" → low-res proxy detection (see scene_score_cmd).
+    Returns list of (start_sec, end_sec) tuples (approx).
+    """
+    series, duration = scene_scores(video_path, mode)
+    cuts = top_k_cuts(series, top_k) if top_k else cuts_at_threshold(series, threshold)
+    if not cuts:
+        return fixed_chunks(duration)
+    return intervals_from_cuts(cuts, duration)
+
 def get_duration(path):
+    return media_probe.duration(path)
+
+def encode_scene_clip(video_path, idx, s, e, out_dir, threads=0):
+    """Encode one preview clip. Returns a report dict (never raises)."""
+    started = time.time()
+    duration = max(0.5, e - s)
+    out_file = Path(out_dir) / f"{Path(video_path).stem}_scene_{idx}.mp4"
+    # create short preview clip (very small) — safe for mobile
+    preset = encoder_bench.preset_for("preview", 28)
+    cmd = f'ffmpeg -hide_banner -loglevel error -ss {s} -i "{video_path}" -t {duration} -c:v libx264 -preset {preset} -crf 28 -threads {threads} -c:a aac -b:a 64k -y "{out_file}"'
     try:
-        cmd = f'ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "{path}"'
-        res = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        return float(res.stdout.strip())
-    except:
-        return 0.0
+        rc = subprocess.call(cmd, shell=True)
+    except Exception as ex:
+        log(f"Clip {idx} failed: {ex}")
+        rc = -1
+    ok = rc == 0 and out_file.exists()
+    if not ok:
+        log(f"⚠ Preview clip {idx} failed (rc={rc}), continuing.")
+    return {
+        "index": idx,
+        "clip": str(out_file) if ok else None,
+        "ok": ok,
+        "mode": "encode",
+        "seconds": round(time.time() - started, 3)
+    }
+
+# ---------------------------------------
+# KEYFRAME INDEX + STREAM-COPY CUTS
+# ---------------------------------------
+def keyframe_index(video_path):
+    """
+    Sorted keyframe timestamps of the first video stream, cached on disk per
+    (path, size, mtime) so every later task on the same source is free.
+    A failed or empty probe is returned but never cached.
+    """
+    sig = _source_sig(video_path)
+    cache = KEYFRAME_CACHE / (hashlib.sha1(sig.encode()).hexdigest() + ".json")
+    try:
+        return json.load(open(cache))["keyframes"]
+    except Exception:
+        pass
+
+    # packet flags only → no decoding, just a demux pass
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video_path
+    ]
+    res = subprocess.run(cmd, capture_output=True, text=True)
+    keyframes = []
+    for line in res.stdout.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) >= 2 and "K" in parts[1]:
+            try:
+                keyframes.append(float(parts[0]))
+            except ValueError:
+                continue
+    keyframes.sort()
+    if res.returncode != 0 or not keyframes:
+        return keyframes
+
+    KEYFRAME_CACHE.mkdir(parents=True, exist_ok=True)
+    tmp = cache.with_name(f".{cache.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"source": sig, "keyframes": keyframes}, f)
+    os.replace(tmp, cache)
+    return keyframes
+
+def nearest_keyframe(keyframes, t):
+    if not keyframes:
+        return None
+    i = bisect_left(keyframes, t)
+    around = keyframes[max(0, i - 1):i + 1]
+    return min(around, key=lambda k: abs(k - t))
 
-def create_scene_clips(video_path, scenes, out_dir):
+def copy_scene_clip(video_path, idx, s, e, out_dir, keyframes, threads=0, max_snap=MAX_KEYFRAME_SNAP):
+    """
+    Stream-copy cut with both boundaries snapped to keyframes. Falls back to a
+    re-encode when a boundary is further than max_snap from any keyframe.
+    """
+    ks, ke = nearest_keyframe(keyframes, s), nearest_keyframe(keyframes, e)
+    if ks is None or abs(ks - s) > max_snap or abs(ke - e) > max_snap or ke <= ks:
+        rep = encode_scene_clip(video_path, idx, s, e, out_dir, threads)
+        rep["fallback"] = "no keyframe near boundary"
+        return rep
+
+    started = time.time()
+    out_file = Path(out_dir) / f"{Path(video_path).stem}_scene_{idx}.mp4"
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{ks + 0.001:.3f}", "-i", video_path, "-t", f"{ke - ks:.3f}",
+        "-c", "copy", "-avoid_negative_ts", "make_zero", "-y", str(out_file)
+    ]
+    try:
+        rc = subprocess.call(cmd)
+    except Exception as ex:
+        log(f"Clip {idx} copy failed: {ex}")
+        rc = -1
+    if rc != 0 or not out_file.exists():
+        rep = encode_scene_clip(video_path, idx, s, e, out_dir, threads)
+        rep["fallback"] = f"stream copy failed (rc={rc})"
+        return rep
+
+    return {
+        "index": idx,
+        "clip": str(out_file),
+        "ok": True,
+        "mode": "copy",
+        "start": ks,
+        "end": ke,
+        "seconds": round(time.time() - started, 3)
+    }
+
+# ---------------------------------------
+# ONE-PASS MULTI-SEGMENT EXTRACTION
+# ---------------------------------------
+def contiguous(scenes, tol=0.05):
+    return all(abs(scenes[i][1] - scenes[i + 1][0]) <= tol for i in range(len(scenes) - 1))
+
+def segment_scene_clips(video_path, scenes, out_dir):
+    """
+    Cut all (contiguous) scenes with ONE ffmpeg: the source is opened, seeked
+    and decoded once, keyframes are forced at every boundary and the segment
+    muxer splits there. Returns per-clip report dicts in scene order.
+    """
+    started = time.time()
+    stem = Path(video_path).stem
+    base, end = scenes[0][0], scenes[-1][1]
+    cuts = ",".join(f"{e - base:.3f}" for _, e in scenes[:-1])
+    pattern = Path(out_dir) / f"{stem.replace('%', '%%')}_scene_%d.mp4"
+
+    cmd = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{base:.3f}", "-i", video_path, "-t", f"{end - base:.3f}",
+        "-c:v", "libx264", "-preset", encoder_bench.preset_for("preview", 28), "-crf", "28",
+        "-c:a", "aac", "-b:a", "64k",
+    ]
+    if cuts:
+        cmd += ["-force_key_frames", cuts, "-segment_times", cuts]
+    cmd += [
+        "-f", "segment", "-segment_start_number", "1",
+        "-reset_timestamps", "1", "-y", str(pattern)
+    ]
+    try:
+        rc = subprocess.call(cmd)
+    except Exception as ex:
+        log(f"Segment pass failed: {ex}")
+        rc = -1
+
+    share = round((time.time() - started) / len(scenes), 3)  # one shared pass
+    results = []
+    for idx in range(1, len(scenes) + 1):
+        out_file = Path(out_dir) / f"{stem}_scene_{idx}.mp4"
+        ok = rc == 0 and out_file.exists()
+        results.append({
+            "index": idx,
+            "clip": str(out_file) if ok else None,
+            "ok": ok,
+            "mode": "segment",
+            "seconds": share
+        })
+    if rc != 0:
+        log(f"⚠ Segment pass exited rc={rc}")
+    return results
+
+def create_scene_clips(video_path, scenes, out_dir, workers=None, report=None, mode="encode"):
     """
     For each scene interval, create a small clip file path (does not render full unless needed).
+    Encodes run concurrently (bounded by CPU cores); results keep scene order and
+    a failed clip is skipped instead of aborting the batch.
     Returns list of clip paths (these can be used later by render manager).
+    If report is a list, per-clip {index, clip, ok, mode, seconds} records are appended.
+    mode="copy" cuts on keyframes with stream copy (I/O-bound, rough previews).
+    mode="segment" encodes every scene in a single ffmpeg pass (contiguous scenes only;
+    otherwise falls back to "encode").
     """
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
-    clips = []
-    for idx, (s, e) in enumerate(scenes, start=1):
-        duration = max(0.5, e - s)
-        out_file = out_dir / f"{Path(video_path).stem}_scene_{idx}.mp4"
-        # create short preview clip (very small) — safe for mobile
-        cmd = f'ffmpeg -hide_banner -loglevel error -ss {s} -i "{video_path}" -t {duration} -c:v libx264 -preset veryfast -crf 28 -c:a aac -b:a 64k -y "{out_file}"'
-        subprocess.call(cmd, shell=True)
-        if out_file.exists():
-            clips.append(str(out_file))
-    return clips
+    if not scenes:
+        return []
+
+    if mode == "segment":
+        if contiguous(scenes):
+            results = segment_scene_clips(video_path, scenes, out_dir)
+            if report is not None:
+                report.extend(results)
+            return [r["clip"] for r in results if r["ok"]]
+        log("Scenes not contiguous → per-clip encode instead of segment pass.")
+        mode = "encode"
+
+    cores = os.cpu_count() or 1
+    workers = max(1, min(workers or cores, len(scenes)))
+    threads = max(1, cores // workers)  # split cores between encodes, no oversubscription
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if mode == "copy":
+            keyframes = keyframe_index(video_path)
+            futures = [
+                pool.submit(copy_scene_clip, video_path, idx, s, e, out_dir, keyframes, threads)
+                for idx, (s, e) in enumerate(scenes, start=1)
+            ]
+        else:
+            futures = [
+                pool.submit(encode_scene_clip, video_path, idx, s, e, out_dir, threads)
+                for idx, (s, e) in enumerate(scenes, start=1)
+            ]
+        results = [f.result() for f in futures]  # scene order, not completion order
+
+    if report is not None:
+        report.extend(results)
+    return [r["clip"] for r in results if r["ok"]]
 
 def scene_split_task(task_json_path):
     """
@@ -115,22 +695,88 @@ def scene_split_task(task_json_path):
         return False
 
     log(f"Detecting scenes for task {task.get('id') or Path(task_json_path).stem}")
-    scenes = detect_scenes_ffmpeg(video)
-    if not scenes:
-        log("No scenes detected, making fallback chunks.")
-        scenes = detect_scenes_ffmpeg(video, threshold=0.1)
+    # one decode → score series; every threshold below is applied in Python
+    detect_mode = task.get("scene_detect_mode", "full")  # "fast" → low-res proxy
+    threshold = task.get("scene_threshold", 0.4)
+    top_k = task.get("scene_top_k")
+
+    task_id = task.get("id") or Path(task_json_path).stem
+    sprite_dir = sprite_dir_for(video, detect_mode, threshold) if task.get("sprites", True) else None
+    need_sprites = sprite_dir is not None and not (sprite_dir / "index.json").exists()
+
+    chunks = task.get("scene_chunks")
+    if chunks == "auto":
+        chunks = os.cpu_count() if get_duration(video) >= CHUNKED_MIN_DURATION else None
+
+    if chunks:
+        # long source: K ranges in parallel (sprites need the sequential pass)
+        def chunk_progress(done, total):
+            task["scene_status"] = "partial"
+            task["scene_progress"] = {"chunks_done": done, "chunks": total,
+                                      "percent": round(100 * done / total, 1)}
+            write_task(task_json_path, task)
+
+        log(f"Chunked detection on {chunks} ranges")
+        cached = chunked_scene_scores(video, detect_mode, chunks, chunk_progress)
+        need_sprites = False
+    else:
+        cached = cached_scene_scores(video, detect_mode)
+    if cached is None and top_k and not need_sprites:
+        # top-K needs the whole series before any cut is known → no partials
+        cached = scene_scores(video, detect_mode)
+    elif cached is None or need_sprites:
+        # decode pass: stream cuts into the task as they appear (+ sprite sheet)
+        def progress(t, duration, cuts):
+            task["scene_status"] = "partial"
+            task["scene_progress"] = {
+                "time": round(t, 2),
+                "duration": round(duration, 2),
+                "percent": round(100 * t / duration, 1) if duration else None,
+                "cuts": len(cuts)
+            }
+            if not top_k:
+                # only closed intervals — the last scene is still open
+                task["scenes"] = [{"start": s, "end": e} for s, e in intervals_from_cuts(cuts, None)]
+            write_task(task_json_path, task)
+
+        for t in stream_scene_cuts(video, threshold, detect_mode, on_progress=progress,
+                                   sprite_dir=sprite_dir):
+            if not top_k:
+                log(f"✂ cut @ {t:.2f}s")
+        cached = cached_scene_scores(video, detect_mode)
+    if sprite_dir is not None and (sprite_dir / "index.json").exists():
+        task["sprite_index"] = str(sprite_dir / "index.json")
+        task["sprite_key"] = sprite_dir.name  # served as /sprites/<key>/<file>
+    series, duration = cached if cached else scene_scores(video, detect_mode)
+    cuts = top_k_cuts(series, top_k) if top_k else cuts_at_threshold(series, threshold)
+    if not cuts:
+        log("No scenes detected, retrying at threshold 0.1 (no re-decode).")
+        cuts = cuts_at_threshold(series, 0.1)
+    scenes = intervals_from_cuts(cuts, duration) if cuts else fixed_chunks(duration)
+    if not cuts:
+        log("Still no cuts, making fallback chunks.")
 
     # save scenes to task
     task["scenes"] = [{"start": s, "end": e} for s, e in scenes]
+    task["scene_status"] = "done"
+    if task.get("scene_verify") and (chunks or detect_mode == "fast"):
+        # opt-in: also run sequential full-res detection, record how far we were off
+        candidate = "chunked" if chunks else "fast"
+        task["scene_accuracy"] = detection_accuracy(video, threshold, candidate=candidate, chunks=chunks)
+        log(f"Fast vs full detection: {task['scene_accuracy']}")
 
     # create preview clips folder
-    previews_dir = STORAGE / "previews" / (task.get("id") or Path(task_json_path).stem)
-    clips = create_scene_clips(video, scenes[:8], previews_dir)  # limit to first 8 previews
+    previews_dir = STORAGE / "previews" / task_id
+    report = []
+    started = time.time()
+    mode = task.get("preview_mode", "encode")  # "copy" | "segment" (see create_scene_clips)
+    clips = create_scene_clips(video, scenes[:8], previews_dir, report=report, mode=mode)  # limit to first 8 previews
     task["scene_clips"] = clips
+    task["scene_clip_report"] = report
+    task["scene_clips_wall"] = round(time.time() - started, 3)
 
     # write back
-    with open(task_json_path, "w") as f:
-        json.dump(task, f, indent=2)
+    write_task(task_json_path, task)
 
     log(f"Scene split complete — {len(scenes)} scenes, {len(clips)} previews created.")
     return True
@@ -138,7 +784,12 @@ def scene_split_task(task_json_path):
 # CLI
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: scene_split.py <task.json>")
+        print("Usage: scene_split.py <task.json> | --compare <video> [threshold] [fast|chunked]")
         sys.exit(1)
+    if sys.argv[1] == "--compare":
+        thr = float(sys.argv[3]) if len(sys.argv) > 3 else 0.4
+        candidate = sys.argv[4] if len(sys.argv) > 4 else "fast"
+        print(json.dumps(detection_accuracy(sys.argv[2], thr, candidate=candidate), indent=2))
+        sys.exit(0)
     ok = scene_split_task(sys.argv[1])
     print("OK" if ok else "FAIL")
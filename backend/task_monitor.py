@@ -9,6 +9,8 @@ ROOT = os.path.expanduser("~/AI-AMV-STUDIO")
 TEMP = os.path.join(ROOT, "storage/temp")
 OUTPUT = os.path.join(ROOT, "storage/output")
 LOGS = os.path.join(ROOT, "storage/logs")
+SPRITES = os.path.join(ROOT, "storage/sprites")
+PROGRESS = os.path.join(ROOT, "storage/progress")
 
 for d in [TEMP, OUTPUT, LOGS]:
     os.makedirs(d, exist_ok=True)
@@ -93,6 +95,36 @@ def api_output_file(fname):
         return jsonify({"error": "not_found"}), 404
     return send_file(path, conditional=True)
 
+@app.route("/sprites/<key>/<fname>")
+def api_sprite_file(key, fname):
+    # index.json + sheet_NNN.jpg from scene_split — thumbnails without video bytes
+    # key = task["sprite_key"] (one sheet set per source video, shared by tasks)
+    path = os.path.join(SPRITES, os.path.basename(key), os.path.basename(fname))
+    if not os.path.exists(path):
+        return jsonify({"error": "not_found"}), 404
+    return send_file(path, conditional=True, max_age=3600)
+
+@app.route("/progress")
+def api_progress():
+    # live ffmpeg status records written by ffmpeg_runner (one small JSON per job)
+    jobs = []
+    if os.path.isdir(PROGRESS):
+        for f in sorted(os.listdir(PROGRESS)):
+            if not f.endswith(".json") or f.startswith("."):
+                continue
+            try:
+                jobs.append(json.load(open(os.path.join(PROGRESS, f))))
+            except:
+                continue
+    return jsonify(jobs)
+
+@app.route("/progress/<job>")
+def api_progress_job(job):
+    path = os.path.join(PROGRESS, os.path.basename(job) + ".json")
+    if not os.path.exists(path):
+        return jsonify({"error": "not_found"}), 404
+    return send_file(path, mimetype="application/json", max_age=0)
+
 @app.route("/logs/<fname>")
 def api_logs(fname):
     safe = os.path.basename(fname)
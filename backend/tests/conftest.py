@@ -0,0 +1,14 @@
+# Tests import the flat backend/ scripts directly. Every module resolves
+# ~/AI-AMV-STUDIO at import time, so HOME points at a scratch dir first:
+# caches, progress records and job markers never touch a real install.
+import os, sys, shutil, tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ["HOME"] = tempfile.mkdtemp(prefix="amv_test_home_")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+needs_ffmpeg = pytest.mark.skipif(
+    not (shutil.which("ffmpeg") and shutil.which("ffprobe")), reason="ffmpeg/ffprobe not installed"
+)
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+import threading
+
+import pytest
+
+import analysis_cache
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "HASH_DIR", tmp_path / "hashes")
+    out = []
+    for i in range(8):
+        p = tmp_path / f"song_{i}.wav"
+        p.write_bytes(f"audio {i}".encode())
+        out.append(p)
+    return out
+
+def test_hash_entry_skips_reread_until_the_file_changes(files):
+    song = files[0]
+    assert analysis_cache.content_hash(song) == hashlib.sha256(b"audio 0").hexdigest()
+
+    entry = analysis_cache._hash_entry(os.path.realpath(song))
+    cached = json.load(open(entry))
+    entry.write_text(json.dumps(dict(cached, sha256="from-entry")))
+    assert analysis_cache.content_hash(song) == "from-entry"
+
+    song.write_bytes(b"new mix")
+    assert analysis_cache.content_hash(song) == hashlib.sha256(b"new mix").hexdigest()
+
+def test_concurrent_misses_keep_every_entry(files):
+    threads = [threading.Thread(target=analysis_cache.content_hash, args=(p,)) for p in files]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(list(analysis_cache.HASH_DIR.glob("*.json"))) == len(files)
+
+def test_hash_entries_are_bounded_lru(files, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "MAX_HASHES", 3)
+    for i, p in enumerate(files):
+        analysis_cache.content_hash(p)
+        entry = analysis_cache._hash_entry(os.path.realpath(p))
+        os.utime(entry, (i, i))  # deterministic use order
+    kept = {json.load(open(e))["path"] for e in analysis_cache.HASH_DIR.glob("*.json")}
+    assert kept == {os.path.realpath(p) for p in files[-3:]}
@@ -0,0 +1,40 @@
+import math
+import random
+
+import pytest
+
+import audio_analysis
+
+np = pytest.importorskip("numpy")
+
+def _noisy_beat(bpm, seconds, seed, sr=audio_analysis.SAMPLE_RATE):
+    """Deterministic click track buried in seeded noise."""
+    rng = random.Random(seed)
+    wave = audio_analysis.click_track(bpm, seconds, sr)
+    return [x + rng.uniform(-0.05, 0.05) for x in wave]
+
+@pytest.mark.parametrize("m", [90, 512, 700, 1500])
+def test_autocorr_paths_agree(m):
+    rng = random.Random(m)
+    env = [max(0.0, rng.gauss(0.0, 1.0)) for _ in range(m)]
+    py = audio_analysis._autocorr_py(env, 45)
+    vec = audio_analysis._autocorr_np(np.asarray(env), 45)
+    assert len(py) == len(vec)
+    assert max(abs(a - b) for a, b in zip(py, vec)) <= 1e-9 * abs(vec[0])
+
+@pytest.mark.parametrize("bpm,seed", [(96, 1), (128, 2), (174, 3)])
+def test_tempo_paths_agree(bpm, seed):
+    wave = _noisy_beat(bpm, 20, seed)
+    py = audio_analysis.estimate_tempo(wave)
+    vec = audio_analysis.estimate_tempo(np.asarray(wave, dtype=np.float64))
+    assert py["bpm"] == vec["bpm"] and abs(py["bpm"] - bpm) <= 1
+    assert py["beats"] == vec["beats"]
+    assert math.isclose(py["confidence"], vec["confidence"], abs_tol=1e-3)
+
+@pytest.mark.parametrize("case", audio_analysis.CLICK_CASES,
+                         ids=lambda c: f"{c[0]}bpm-{c[1]}s-off{c[2]}")
+def test_click_cases(case, monkeypatch):
+    monkeypatch.setattr(audio_analysis, "CLICK_CASES", [case])
+    row, = audio_analysis.click_check()
+    assert row["ok"], row
+    assert row["python"]["bpm"] == row["numpy"]["bpm"]
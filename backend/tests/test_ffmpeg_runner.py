@@ -0,0 +1,28 @@
+import json
+import threading
+
+import ffmpeg_runner
+
+def test_concurrent_flushes_do_not_race():
+    status = ffmpeg_runner.Status("race")
+    errors = []
+
+    def hammer():
+        try:
+            for i in range(1000):
+                status.update({"frame": str(i), "progress": "continue"})
+                status.flush(force=True)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert json.load(open(status.path))["job"] == "race"
+
+def test_stalled_is_not_a_signal_exit():
+    assert ffmpeg_runner.STALLED < -64
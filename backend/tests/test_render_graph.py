@@ -0,0 +1,66 @@
+import subprocess
+
+import pytest
+
+import media_probe
+import render_graph
+from conftest import needs_ffmpeg
+
+MIXED = ["none", "fade", "none", "glitch", "whip", "none"]
+
+def _timeline(effects, block=0.8):
+    return [{"clip": None, "start": i * block, "end": (i + 1) * block, "effect": fx}
+            for i, fx in enumerate(effects)]
+
+@pytest.fixture(scope="module")
+def source(tmp_path_factory):
+    out = tmp_path_factory.mktemp("media") / "source.mp4"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                    "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=25:d=6",
+                    "-c:v", "libx264", "-pix_fmt", "yuv420p", str(out)], check=True)
+    return str(out)
+
+@needs_ffmpeg  # effects.validate needs the filter probe
+def test_blocks_share_one_timebase():
+    _, graph, _ = render_graph.compile_timeline(_timeline(MIXED), source="src.mp4")
+    blocks = [c for c in graph.split(";") if c.startswith("[") and "trim=" in c]
+    concats = [c for c in graph.split(";") if "concat=" in c]
+    assert blocks and all(f"settb=1/{render_graph.RENDER_FPS}[" in c for c in blocks)
+    assert all(f"settb=1/{render_graph.RENDER_FPS}[" in c for c in concats)
+
+@needs_ffmpeg
+@pytest.mark.parametrize("effects", [MIXED, ["none", "fade", "none"], ["fade"] * 3])
+def test_mixed_effects_render(source, tmp_path, effects):
+    out = tmp_path / "render.mp4"
+    code = subprocess.call(render_graph.build_cmd(_timeline(effects), out, source=source))
+    assert code == 0
+    info = media_probe.video_info(out)
+    assert info and abs(info["duration"] - 0.8 * len(effects)) < 0.1
+
+@needs_ffmpeg
+def test_segmented_mixed_render(source, tmp_path, monkeypatch):
+    monkeypatch.setattr(render_graph, "MIN_SEGMENT", 1.0)
+    out = tmp_path / "render.mp4"
+    code, report = render_graph.render_segmented(_timeline(MIXED), out, source=source,
+                                                 segments=2, work_dir=tmp_path / "seg")
+    assert code == 0 and len(report) == 2 and all(r["ok"] for r in report)
+    assert abs(media_probe.duration(out) - 0.8 * len(MIXED)) < 0.1
+
+def test_segments_never_split_a_transition(monkeypatch):
+    monkeypatch.setattr(render_graph, "MIN_SEGMENT", 1.0)
+    monkeypatch.setattr(render_graph.effects, "transition",
+                        lambda name: None if name in ("none", "glitch") else "fade")
+    blocks = _timeline(["fade"] * 5 + ["none"] + ["fade"] * 6)
+    parts = render_graph.plan_segments(blocks, 4)
+    assert [len(p) for p, _ in parts] == [6, 6]
+    assert sum(f for _, f in parts) == round(0.8 * 12 * render_graph.RENDER_FPS)
+    assert len(render_graph.plan_segments(_timeline(["fade"] * 8), 4)) == 1
+
+def test_segmentation_is_opt_in(monkeypatch):
+    monkeypatch.setattr(render_graph.os, "cpu_count", lambda: 8)
+    long_edit = _timeline(["none"] * 400)  # 320 s
+    assert render_graph.segment_count(long_edit, None) is None
+    assert render_graph.segment_layout(long_edit, None, None) is None
+    assert render_graph.segment_count(long_edit, "auto") == 8
+    assert render_graph.segment_count(_timeline(["none"] * 10), "auto") is None
+    assert render_graph.segment_layout(long_edit, "src.mp4", 2) != render_graph.segment_layout(long_edit, "src.mp4", 4)
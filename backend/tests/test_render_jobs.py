@@ -0,0 +1,40 @@
+import json
+import os
+
+import pytest
+
+import render_jobs
+import render_manager
+
+@pytest.fixture
+def temp(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_jobs, "JOBS", tmp_path / "jobs")
+    monkeypatch.setattr(render_manager, "TEMP", tmp_path / "temp")
+    render_manager.TEMP.mkdir()
+    return render_manager.TEMP
+
+def _touch(path, obj, bump=0):
+    path.write_text(json.dumps(obj))
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump))
+
+def test_detect_tasks_skips_sidecars(temp):
+    for name in ("task_1.json", "task_1_timeline.json", "task_1_auto_plan.json"):
+        (temp / name).write_text("{}")
+    assert [p.name for p in render_manager.detect_tasks()] == ["task_1.json"]
+
+def test_rewritten_task_is_pending_again(temp):
+    task = temp / "task_1.json"
+    _touch(task, {"id": "task_1"})
+    with render_jobs.claim("task_1", task) as job:
+        job.failed("no timeline yet")
+    assert render_manager.detect_tasks() == []
+    assert render_jobs.claim("task_1", task) is None
+
+    _touch(task, {"id": "task_1", "timeline": "t.json"}, bump=10**9)  # compose
+    assert render_manager.detect_tasks() == [task]
+    with render_jobs.claim("task_1", task) as job:
+        job.done(output="render_task_1.mp4")
+    assert render_jobs.state("task_1") == render_jobs.DONE
+    assert not (render_jobs.JOBS / "task_1.failed").exists()
+    assert render_manager.detect_tasks() == []
@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import render_cache
+import render_graph
+import render_manager
+
+@pytest.fixture
+def task(tmp_path, monkeypatch):
+    for d in (render_manager.TEMP, render_manager.OUTPUT):
+        d.mkdir(parents=True, exist_ok=True)
+    monkeypatch.setattr(render_cache, "RENDER_CACHE", tmp_path / "cache")
+    monkeypatch.setattr(render_manager, "check_video", lambda p: Path(p).exists())
+    monkeypatch.setattr(render_manager, "re_render", lambda task: task)
+    timeline = tmp_path / "t_timeline.json"
+    timeline.write_text(json.dumps([{"clip": "a.mp4", "start": 0, "end": 1, "effect": "none"}]))
+    return {"id": "stale", "timeline": str(timeline)}
+
+def test_failed_render_never_reuses_an_old_output(task, monkeypatch):
+    stale = render_manager.OUTPUT / "render_stale.mp4"
+    stale.write_bytes(b"render of an earlier plan")
+    monkeypatch.setattr(render_graph, "render_timeline", lambda *a: 1)
+
+    out = render_manager.render_task(task)
+
+    assert "final_video" not in out
+    assert not stale.exists()
+    assert not list(render_cache.RENDER_CACHE.glob("*.mp4"))
+
+def test_successful_render_is_cached(task, monkeypatch):
+    def render(task, output, segments=None):
+        Path(output).write_bytes(b"fresh render")
+        return 0
+    monkeypatch.setattr(render_graph, "render_timeline", render)
+
+    out = render_manager.render_task(task)
+
+    assert out["final_video"] and out["render_cache"] == "stored"
+    assert [p.read_bytes() for p in render_cache.RENDER_CACHE.glob("*.mp4")] == [b"fresh render"]
@@ -0,0 +1,144 @@
+import json, subprocess
+
+import pytest
+
+import scene_split
+from conftest import needs_ffmpeg
+
+SAMPLE = """frame:0    pts:0       pts_time:0
+lavfi.scene_score=0.000000
+frame:1    pts:512     pts_time:0.04
+lavfi.scene_score=0.812500
+"""
+
+def test_parse_scene_metadata():
+    assert list(scene_split.parse_scene_metadata(SAMPLE.splitlines())) == [(0.0, 0.0), (0.04, 0.8125)]
+
+@pytest.mark.parametrize("mode", ["full", "fast"])
+def test_scores_go_to_stdout(mode):
+    graph = scene_split.scene_score_cmd("in.mp4", mode)[-4]
+    assert "file=-" in graph and "pipe" not in graph
+
+def test_graph_escape():
+    assert scene_split._graph_escape("/a:b/it's") == "/a\\\\:b/it\\\\'s"
+
+@pytest.fixture(scope="module")
+def three_shots(tmp_path_factory):
+    """3 s clip of three different 1 s shots: hard cuts at 1 s and 2 s."""
+    out = tmp_path_factory.mktemp("media") / "three_shots.mp4"
+    shots = ["testsrc2=d=1", "smptebars=d=1", "mandelbrot,trim=duration=1"]
+    inputs, chains = [], []
+    for i, src in enumerate(shots):
+        inputs += ["-f", "lavfi", "-i", src]
+        chains.append(f"[{i}:v]scale=320:240,fps=25,format=yuv420p,setsar=1[s{i}]")
+    graph = ";".join(chains) + ";[s0][s1][s2]concat=n=3:v=1:a=0"
+    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-y"] + inputs
+                   + ["-filter_complex", graph, "-c:v", "libx264", str(out)], check=True)
+    return str(out)
+
+@needs_ffmpeg
+@pytest.mark.parametrize("mode", ["full", "fast"])
+def test_scene_scores_smoke(three_shots, mode):
+    series, duration = scene_split.scene_scores(three_shots, mode)
+    assert len(series) > 0  # at least one parsed score line
+    assert duration > 2.5
+    cuts = scene_split.cuts_at_threshold(series, 0.4)
+    assert [round(t) for t in cuts] == [1, 2]
+
+@needs_ffmpeg
+def test_stream_scene_cuts_smoke(three_shots):
+    assert [round(t) for t in scene_split.stream_scene_cuts(three_shots, 0.4)] == [1, 2]
+
+@needs_ffmpeg
+def test_sprite_pass_smoke(three_shots, tmp_path):
+    sprite_dir = tmp_path / "sprites:x"  # ':' must survive both graph escape levels
+    cuts = list(scene_split.stream_scene_cuts(three_shots, 0.4, sprite_dir=sprite_dir))
+    assert [round(t) for t in cuts] == [1, 2]
+    index = json.load(open(sprite_dir / "index.json"))
+    assert index["sheets"] == ["sheet_001.jpg"]
+    assert [th["cut"] for th in index["thumbs"]].count(True) == 2
+
+def test_failed_decode_is_not_cached(tmp_path, monkeypatch):
+    video = tmp_path / "broken.mp4"
+    video.write_bytes(b"not a video")
+    monkeypatch.setattr(scene_split, "SCORE_CACHE", tmp_path / "scores")
+    monkeypatch.setattr(scene_split, "get_duration", lambda path: 0.0)
+    monkeypatch.setattr(scene_split, "scene_score_cmd", lambda *a, **k: ["false"])
+
+    assert scene_split.scene_scores(str(video)) == ([], 0.0)
+    assert scene_split.cached_scene_scores(str(video)) is None
+
+def _probe(returncode, calls):
+    def run(cmd, **kw):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, returncode, "0.000000,K__\n0.040000,___\n2.000000,K__\n", "")
+    return run
+
+def test_keyframe_index_caches_only_a_clean_probe(tmp_path, monkeypatch):
+    video = tmp_path / "source.mp4"
+    video.write_bytes(b"video")
+    monkeypatch.setattr(scene_split, "KEYFRAME_CACHE", tmp_path / "keyframes")
+    calls = []
+
+    monkeypatch.setattr(scene_split.subprocess, "run", _probe(1, calls))
+    assert scene_split.keyframe_index(str(video)) == [0.0, 2.0]
+    assert not (tmp_path / "keyframes").exists()
+
+    monkeypatch.setattr(scene_split.subprocess, "run", _probe(0, calls))
+    assert scene_split.keyframe_index(str(video)) == [0.0, 2.0]
+    assert scene_split.keyframe_index(str(video)) == [0.0, 2.0]
+    assert len(calls) == 2  # third call served from disk
+    assert [p.suffix for p in (tmp_path / "keyframes").iterdir()] == [".json"]
+
+def test_failed_stream_is_not_cached(tmp_path, monkeypatch):
+    video = tmp_path / "broken.mp4"
+    video.write_bytes(b"not a video")
+    monkeypatch.setattr(scene_split, "SCORE_CACHE", tmp_path / "scores")
+    monkeypatch.setattr(scene_split, "scene_score_cmd", lambda *a, **k: [
+        "sh", "-c", "printf 'frame:0 pts:0 pts_time:1.0\\nlavfi.scene_score=0.9\\n'; exit 1"])
+
+    sprites = tmp_path / "sprites"
+    cuts = list(scene_split.stream_scene_cuts(str(video), 0.4, duration=2.0, sprite_dir=sprites))
+
+    assert cuts == [1.0]  # partial results still stream out...
+    assert scene_split.cached_scene_scores(str(video)) is None  # ...but are not cached
+    assert not (sprites / "index.json").exists()
+
+def test_failed_chunk_is_not_merged(tmp_path, monkeypatch):
+    video = tmp_path / "long.mp4"
+    video.write_bytes(b"stand-in source")
+    monkeypatch.setattr(scene_split, "SCORE_CACHE", tmp_path / "scores")
+    monkeypatch.setattr(scene_split, "get_duration", lambda path: 40.0)
+    good = ["sh", "-c", "printf 'frame:0 pts:0 pts_time:3.0\\nlavfi.scene_score=0.9\\n'"]
+    # first range (starts at 0) decodes fine, the second one always fails
+    monkeypatch.setattr(scene_split, "scene_score_cmd",
+                        lambda *a, start=None, **k: ["false"] if start else good)
+    sequential = []
+    monkeypatch.setattr(scene_split, "scene_scores",
+                        lambda path, mode="full", cache=True:
+                        sequential.append(mode) or ([(3.0, 0.9)], 40.0))
+
+    assert scene_split.chunked_scene_scores(str(video), chunks=2) == ([(3.0, 0.9)], 40.0)
+    assert sequential == ["full"]
+    assert scene_split.cached_scene_scores(str(video), "full-chunked") is None
+
+def test_detection_accuracy_times_fresh_decodes(tmp_path, monkeypatch):
+    video = tmp_path / "source.mp4"
+    video.write_bytes(b"stand-in source")
+    monkeypatch.setattr(scene_split, "SCORE_CACHE", tmp_path / "scores")
+    monkeypatch.setattr(scene_split, "get_duration", lambda path: 4.0)
+    decodes = []
+    def cmd(path, mode="full", *a, **k):
+        decodes.append(mode)
+        return ["sh", "-c", "printf 'frame:0 pts:0 pts_time:2.0\\nlavfi.scene_score=0.9\\n'"]
+    monkeypatch.setattr(scene_split, "scene_score_cmd", cmd)
+
+    scene_split.scene_scores(str(video), "fast")
+    scene_split.scene_scores(str(video), "full")
+    assert decodes == ["fast", "full"]
+    scene_split.scene_scores(str(video), "full")  # cached
+    assert decodes == ["fast", "full"]
+
+    report = scene_split.detection_accuracy(str(video), candidate="fast")
+    assert decodes == ["fast", "full", "fast", "full"]
+    assert report["recall"] == 1.0